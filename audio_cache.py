@@ -0,0 +1,327 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_cache")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # On-disk limit
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024  # In-memory limit
+DEFAULT_PREFETCH_WORKERS = 4
+AUDIO_EXTENSIONS = ('.mp3', '.wav')
+MIME_TYPES = {'.mp3': 'audio/mpeg', '.wav': 'audio/wav'}
+
+# Set SPELLING_AUDIO_PORT to serve cached audio over HTTP, together with
+# SPELLING_AUDIO_URL, the base URL browsers use to reach it (for example
+# https://spelling.example.org/audio behind a reverse proxy). Without them audio
+# goes through Streamlit's media endpoint, which only the process that rendered
+# the page can answer: several app processes behind a load balancer without
+# sticky sessions need the audio server, or players will 404
+AUDIO_PORT = os.environ.get("SPELLING_AUDIO_PORT")
+AUDIO_URL = os.environ.get("SPELLING_AUDIO_URL")
+if AUDIO_PORT and not AUDIO_URL:
+    # A guessed localhost URL only works for a browser on the server itself. Checked
+    # once per process, so students never see the misconfiguration on every word
+    logger.error("SPELLING_AUDIO_PORT is set but SPELLING_AUDIO_URL is not; the audio server is "
+                 "off until SPELLING_AUDIO_URL names the URL browsers use to reach it")
+    AUDIO_PORT = None
+
+
+class AudioCache:
+    """Content-addressed audio cache with an in-memory LRU in front of a bounded disk store"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_bytes=DEFAULT_MEMORY_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> bytes, least recently used first
+        self._memory_size = 0
+        self._disk = OrderedDict()  # key -> (file size, extension), least recently used first
+        self._disk_size = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    @staticmethod
+    def make_key(word, lang, slow, engine):
+        raw = f"{engine}\0{lang}\0{int(bool(slow))}\0{word}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def path_for(self, key, extension='.mp3'):
+        return os.path.join(self.cache_dir, f"{key}{extension}")
+
+    def _scan_disk(self):
+        # Rebuild the LRU order from file modification times
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key, extension = os.path.splitext(name)
+            if extension not in AUDIO_EXTENSIONS:
+                continue
+            try:
+                st_ = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st_.st_mtime, key, st_.st_size, extension))
+        for _, key, size, extension in sorted(entries):
+            self._disk[key] = (size, extension)
+            self._disk_size += size
+        self._evict_disk()
+
+    def _adopt(self, key):
+        """Index a file another process sharing the cache directory wrote; returns its entry or None"""
+        for extension in AUDIO_EXTENSIONS:
+            try:
+                size = os.stat(self.path_for(key, extension)).st_size
+            except OSError:
+                continue
+            with self._lock:
+                if key not in self._disk:
+                    self._disk[key] = (size, extension)
+                    self._disk_size += size
+                return self._disk[key]
+        return None
+
+    def extension_of(self, key):
+        with self._lock:
+            entry = self._disk.get(key)
+        if entry is None:
+            entry = self._adopt(key)
+        return entry[1] if entry else None
+
+    def contains(self, key):
+        with self._lock:
+            if key in self._memory or key in self._disk:
+                return True
+        return self._adopt(key) is not None
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return data
+            entry = self._disk.get(key)
+
+        if entry is None:
+            entry = self._adopt(key)
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+        path = self.path_for(key, entry[1])
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                entry = self._disk.pop(key, None)
+                if entry is not None:
+                    self._disk_size -= entry[0]
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, data)
+            self.hits += 1
+            self.disk_hits += 1
+        return data
+
+    def put(self, key, data, extension='.mp3'):
+        path = self.path_for(key, extension)
+        # A unique name per writer, since app processes share the cache directory
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            os.fchmod(fd, 0o644)  # mkstemp files are private; the audio server may run as another user
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_size -= old[0]
+            self._disk[key] = (len(data), extension)
+            self._disk_size += len(data)
+            self._remember(key, data)
+            self._evict_disk()
+
+    def get_or_create(self, word, backend, lang='en', slow=False):
+        """Return cached audio for the word, asking the TTS backend only on a miss"""
+        key = self.make_key(word, lang, slow, backend.engine)
+        data = self.get(key)
+        if data is None:
+            data = backend.synthesize(word, lang, slow)
+            if data:
+                self.put(key, data, backend.extension)
+        return data
+
+    def _remember(self, key, data):
+        # Caller holds the lock
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        if len(data) > self.memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        # Caller holds the lock (or is the constructor)
+        while self._disk_size > self.max_bytes and self._disk:
+            key, (size, extension) = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key, extension))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._disk),
+                'disk_bytes': self._disk_size,
+                'memory_bytes': self._memory_size,
+            }
+
+
+class AudioPrefetcher:
+    """Generates audio on a thread pool, collapsing duplicate requests for the same word"""
+
+    def __init__(self, cache, workers=DEFAULT_PREFETCH_WORKERS):
+        self.cache = cache
+        self.collapsed = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-prefetch")
+        self._inflight = {}  # cache key -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, word, backend, lang='en', slow=False):
+        """Start generating audio in the background; returns None if it is already cached"""
+        key = AudioCache.make_key(word, lang, slow, backend.engine)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.collapsed += 1
+                return future
+            if self.cache.contains(key):
+                return None
+            future = self._executor.submit(self.cache.get_or_create, word, backend, lang, slow)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _, key=key: self._finished(key))
+        return future
+
+    def fetch(self, word, backend, lang='en', slow=False):
+        """Return audio for the word, joining an in-flight request instead of starting a new one"""
+        future = self.submit(word, backend, lang, slow)
+        if future is not None:
+            return future.result()
+        return self.cache.get_or_create(word, backend, lang, slow)
+
+    def pending(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def _finished(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+
+_cache = None
+_prefetcher = None
+_server = None
+_cache_lock = threading.Lock()
+
+
+def _cache_stat(name):
+    return lambda: _cache.stats()[name] if _cache else 0
+
+
+metrics.register_gauge('spelling_audio_cache_hits_total', _cache_stat('hits'), kind='counter')
+metrics.register_gauge('spelling_audio_cache_misses_total', _cache_stat('misses'), kind='counter')
+metrics.register_gauge('spelling_audio_cache_hit_ratio', _cache_stat('hit_ratio'))
+metrics.register_gauge('spelling_audio_cache_bytes', _cache_stat('disk_bytes'))
+metrics.register_gauge('spelling_audio_prefetch_collapsed_total',
+                       lambda: _prefetcher.collapsed if _prefetcher else 0, kind='counter')
+
+
+def set_audio_cache(cache):
+    """Replace the process-wide cache, e.g. with one in a temporary directory"""
+    global _cache, _prefetcher
+    with _cache_lock:
+        _cache = cache
+        _prefetcher = None
+
+
+def get_audio_cache():
+    """Process-wide cache shared by every Streamlit session"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AudioCache()
+    return _cache
+
+
+def get_prefetcher():
+    """Process-wide prefetcher so concurrent sessions share in-flight work"""
+    global _prefetcher
+    if _prefetcher is None:
+        cache = get_audio_cache()
+        with _cache_lock:
+            if _prefetcher is None:
+                _prefetcher = AudioPrefetcher(cache)
+    return _prefetcher
+
+
+def get_audio_url(key, extension):
+    """Browser URL for cached audio, or None when the audio server is not enabled"""
+    global _server
+    if not AUDIO_PORT:
+        return None
+    if _server is None:
+        cache = get_audio_cache()
+        with _cache_lock:
+            if _server is None:
+                # http.server is only imported by processes that serve audio
+                from audio_server import start_audio_server
+                try:
+                    _server = start_audio_server(cache, AUDIO_PORT)
+                except OSError:
+                    # Another app process on this host has the port; it serves the
+                    # same cache directory, picking up files this process writes
+                    _server = False
+    return f"{AUDIO_URL}/{key}{extension}"
@@ -0,0 +1,61 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from audio_cache import MIME_TYPES
+
+
+class AudioRequestHandler(BaseHTTPRequestHandler):
+    """Serves /audio/<key><ext> from the cache; keys are content hashes, so responses never change"""
+    cache = None
+    path_pattern = re.compile(r'^/audio/([0-9a-f]{64})(\.mp3|\.wav)$')
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        match = self.path_pattern.match(self.path.split('?', 1)[0])
+        if not match:
+            self.send_error(404)
+            return
+        key, extension = match.groups()
+        etag = f'"{key}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self._send_cache_headers(etag)
+            self.end_headers()
+            return
+
+        data = self.cache.get(key) if self.cache.extension_of(key) == extension else None
+        if data is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', MIME_TYPES[extension])
+        self.send_header('Content-Length', str(len(data)))
+        self._send_cache_headers(etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+    def _send_cache_headers(self, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        self.send_header('Access-Control-Allow-Origin', '*')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_audio_server(cache, port, host=''):
+    """Serve the cache over HTTP on a daemon thread; returns the server"""
+    handler = type('BoundAudioRequestHandler', (AudioRequestHandler,), {'cache': cache})
+    server = ThreadingHTTPServer((host, int(port)), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="audio-server", daemon=True).start()
+    return server
@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from db import get_repository
+
+# scrypt cost: N = 2**SCRYPT_LOG_N; raise it as hardware allows
+SCRYPT_LOG_N = int(os.environ.get("SPELLING_SCRYPT_LOG_N", "14"))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600_000  # Used only where OpenSSL lacks scrypt
+SALT_BYTES = 16
+HASH_WORKERS = os.cpu_count() or 2
+CREDENTIAL_CACHE_SIZE = 1024
+CREDENTIAL_CACHE_TTL = 300  # Seconds
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def hash_password(password, log_n=SCRYPT_LOG_N):
+    """Salted scrypt hash as 'scrypt$log_n$r$p$salt$hash' (PBKDF2 if scrypt is unavailable)"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    if hasattr(hashlib, 'scrypt'):
+        derived = hashlib.scrypt(password.encode(), salt=salt, n=2 ** log_n, r=SCRYPT_R, p=SCRYPT_P,
+                                 maxmem=256 * 2 ** log_n * SCRYPT_R)
+        return f"scrypt${log_n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(derived)}"
+    derived = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(derived)}"
+
+
+def verify_password(password, stored, log_n=SCRYPT_LOG_N):
+    """Check a password in constant time; returns (matches, needs_rehash)"""
+    parts = stored.split('$')
+    if parts[0] == 'scrypt' and len(parts) == 6:
+        stored_log_n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        salt, expected = base64.b64decode(parts[4]), base64.b64decode(parts[5])
+        derived = hashlib.scrypt(password.encode(), salt=salt, n=2 ** stored_log_n, r=r, p=p,
+                                 maxmem=256 * 2 ** stored_log_n * r, dklen=len(expected))
+        return hmac.compare_digest(derived, expected), stored_log_n != log_n
+    if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+        salt, expected = base64.b64decode(parts[2]), base64.b64decode(parts[3])
+        derived = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, int(parts[1]), len(expected))
+        return hmac.compare_digest(derived, expected), hasattr(hashlib, 'scrypt')
+    # Accounts created before salting store a bare SHA-256 hex digest
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, stored), True
+
+
+class CredentialCache:
+    """Small LRU of username -> stored hash with a TTL, so login storms skip the database"""
+
+    def __init__(self, maxsize=CREDENTIAL_CACHE_SIZE, ttl=CREDENTIAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # username -> (expires, stored hash)
+        self._lock = threading.Lock()
+
+    def get(self, username):
+        """(found, stored hash); found is False on a miss or an expired entry"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                return False, None
+            self._entries.move_to_end(username)
+            return True, entry[1]
+
+    def put(self, username, stored):
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, stored)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
+
+
+class Authenticator:
+    """Registration and login with hashing on a bounded thread pool"""
+
+    def __init__(self, repository=None, log_n=SCRYPT_LOG_N, workers=HASH_WORKERS):
+        self._repository = repository
+        self.log_n = log_n
+        self.cache = CredentialCache()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        # Verified against when the user doesn't exist, so timing doesn't reveal usernames
+        self._dummy_hash = hash_password(secrets.token_hex(8), log_n)
+
+    @property
+    def repository(self):
+        return self._repository or get_repository()
+
+    def _stored_hash(self, username):
+        found, stored = self.cache.get(username)
+        if not found:
+            stored = self.repository.get_password_hash(username)
+            # Unknown names aren't cached, so a new account is seen right away
+            if stored:
+                self.cache.put(username, stored)
+        return stored
+
+    def verify(self, username, password):
+        stored = self._stored_hash(username)
+        matches, needs_rehash = self._executor.submit(
+            verify_password, password, stored or self._dummy_hash, self.log_n).result()
+        if not stored or not matches:
+            return False
+        if needs_rehash:
+            # Upgrade legacy or weaker hashes now that we know the password
+            new_hash = self._executor.submit(hash_password, password, self.log_n).result()
+            self.repository.update_password_hash(username, new_hash)
+            self.cache.put(username, new_hash)
+        return True
+
+    def register(self, username, password):
+        password_hash = self._executor.submit(hash_password, password, self.log_n).result()
+        self.repository.create_user(username, password_hash)
+        self.cache.invalidate(username)
+
+
+_authenticator = None
+_authenticator_lock = threading.Lock()
+
+
+def get_authenticator():
+    global _authenticator
+    if _authenticator is None:
+        with _authenticator_lock:
+            if _authenticator is None:
+                _authenticator = Authenticator()
+    return _authenticator
@@ -0,0 +1,471 @@
+"""Benchmarks for the Spelling Bee app
+
+Run one with: python benchmarks.py <benchmark> [options]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_cache import AudioCache, set_audio_cache
+from db import SpellingRepository, close_attempt_log, close_progress_writer, set_repository
+from idle_sessions import IdleSessionEvictor
+from progress_summary import ProgressSummary
+from scheduler import FIRST_TRY, RETRY, DueQueue, quality_for, review
+from state_store import MemoryStateStore, set_state_store
+from word_lists import WordList
+
+# What the submit handler used to sleep before advancing, in seconds
+BLOCKING_FEEDBACK_DELAYS = {'correct': 2.0, 'first_miss': 1.0, 'second_miss': 3.0}
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spelling_app.py")
+# Dependencies a cold start shouldn't pay for until a view or cache miss needs them
+LAZY_MODULES = ('pandas', 'gtts', 'http.server', 'multiprocessing', 'argparse')
+LOAD_STEPS = ('load', 'register', 'login', 'start_practice', 'answer', 'statistics', 'admin_dashboard')
+
+
+def temp_repository():
+    tmp_dir = tempfile.mkdtemp(prefix="spelling_bench_")
+    repository = SpellingRepository(os.path.join(tmp_dir, "progress.db"), os.path.join(tmp_dir, "users.db"))
+    return tmp_dir, repository
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def click(app, label):
+    next(button for button in app.button if button.label == label).click().run()
+
+
+def step_timer(app, username, record):
+    def timed(step, action):
+        start = time.perf_counter()
+        action()
+        record(step, time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(f"{username} {step}: {app.exception[0].message}")
+    return timed
+
+
+def register(app, username, timed):
+    """Open the app and register"""
+    timed('load', app.run)
+
+    app.text_input(key="reg_username").input(username)
+    app.text_input(key="reg_password").input("password")
+    app.text_input(key="reg_confirm").input("password")
+    timed('register', app.button(key="register_button").click().run)
+
+
+def log_in(app, username, timed):
+    """Log in from the login form"""
+    app.text_input(key="login_username").input(username)
+    app.text_input(key="login_password").input("password")
+    timed('login', app.button(key="login_button").click().run)
+
+
+def sign_up(app, username, timed):
+    """Open the app, register and log in"""
+    register(app, username, timed)
+    log_in(app, username, timed)
+
+
+def practice(app, answers, miss_rate, rng, timed, db_ops=None):
+    """Start practice, submit answers (some wrong) and open the statistics view"""
+    timed('start_practice', lambda: click(app, "Start New Practice"))
+
+    for _ in range(answers):
+        if not app.session_state['practice_mode']:
+            break
+        word = app.session_state['current_word']
+        typed = word if rng.random() >= miss_rate else word[::-1] + "x"
+        input_key = f"word_input_{app.session_state['word_count']}_{app.session_state['attempts']}"
+        app.text_input(key=input_key).input(typed)
+        queries = db_ops[0].queries if db_ops else 0
+        timed('answer', lambda: click(app, "Submit"))
+        if db_ops:
+            db_ops[1].append(db_ops[0].queries - queries)
+
+    timed('statistics', lambda: click(app, "📊 View Word Statistics"))
+
+
+def app_environment():
+    """Temp database, audio cache and login store for driving the app with AppTest and stub TTS"""
+    os.environ["SPELLING_TTS_BACKEND"] = "stub"
+    tmp_dir, repository = temp_repository()
+    set_repository(repository)
+    set_audio_cache(AudioCache(os.path.join(tmp_dir, "audio")))
+    set_state_store(MemoryStateStore())
+    return tmp_dir, repository
+
+
+def close_app_environment(tmp_dir, repository):
+    # The app's background writers flush before their database is removed
+    close_attempt_log()
+    close_progress_writer()
+    set_repository(None)
+    repository.close()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_feedback(args):
+    """Submit-to-next-screen time through the real app, next to the sleeps the submit handler used to hold"""
+    from streamlit.testing.v1 import AppTest
+
+    tmp_dir, repository = app_environment()
+    try:
+        rng = random.Random(args.seed)
+        holds = {outcome: [] for outcome in BLOCKING_FEEDBACK_DELAYS}
+        untimed = lambda step, seconds: None
+        for i in range(args.sessions):
+            app = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+            sign_up(app, f"student{i}", step_timer(app, f"student{i}", untimed))
+            click(app, "Start New Practice")
+            for _ in range(args.words):
+                if not app.session_state['practice_mode']:
+                    break
+                word = app.session_state['current_word']
+                roll = rng.random()
+                if roll < 0.7:
+                    submits = [('correct', word)]
+                elif roll < 0.9:
+                    submits = [('first_miss', word[::-1] + "x"), ('correct', word)]
+                else:
+                    submits = [('first_miss', word[::-1] + "x"), ('second_miss', word[::-1] + "x")]
+                for outcome, typed in submits:
+                    input_key = f"word_input_{app.session_state['word_count']}_{app.session_state['attempts']}"
+                    app.text_input(key=input_key).input(typed)
+                    # The run covers the handler, its rerun and rendering the next word or retry
+                    start = time.perf_counter()
+                    click(app, "Submit")
+                    holds[outcome].append(time.perf_counter() - start)
+                    if app.exception:
+                        raise RuntimeError(f"student{i} submit: {app.exception[0].message}")
+
+        print(f"{args.sessions} students x {args.words} words through AppTest")
+        print(f"{'submit':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'old sleep ms':>14}")
+        for outcome, values in holds.items():
+            print(f"{outcome:<14}{len(values):>7}{percentile(values, 50) * 1000:>10.1f}"
+                  f"{percentile(values, 95) * 1000:>10.1f}{BLOCKING_FEEDBACK_DELAYS[outcome] * 1000:>14.0f}")
+        every = [value for values in holds.values() for value in values]
+        slept = statistics.mean(BLOCKING_FEEDBACK_DELAYS[outcome] for outcome, values in holds.items()
+                                for _ in values)
+        print(f"submits held at least {min(BLOCKING_FEEDBACK_DELAYS.values()):.0f}s: "
+              f"{sum(value >= min(BLOCKING_FEEDBACK_DELAYS.values()) for value in every)} of {len(every)}")
+        print(f"sessions per script thread at {args.think_time:.0f}s think time: "
+              f"{args.think_time / statistics.mean(every):.0f} now, "
+              f"{args.think_time / (statistics.mean(every) + slept):.1f} with the old sleeps added back")
+    finally:
+        close_app_environment(tmp_dir, repository)
+
+
+def bench_load(args):
+    """Simulated concurrent students driving the real app with AppTest, stub TTS and a temp database"""
+    from streamlit.testing.v1 import AppTest
+
+    tmp_dir, repository = app_environment()
+    timings = {step: [] for step in LOAD_STEPS}
+
+    def record(step, seconds):
+        timings[step].append(seconds)
+
+    def new_app():
+        return AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+
+    try:
+        def student(i):
+            app = new_app()
+            timed = step_timer(app, f"student{i}", record)
+            sign_up(app, f"student{i}", timed)
+            practice(app, args.answers, args.miss_rate, random.Random(args.seed + i), timed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(student, range(args.users)))
+        elapsed = time.perf_counter() - started
+
+        # Admin dashboard renders with every student's progress in place
+        untimed = lambda step, seconds: None
+        admin = new_app()
+        register(admin, "admin", step_timer(admin, "admin", untimed))
+        # Roles are read at login, and a new account is a student
+        repository.set_user_role("admin", "admin")
+        log_in(admin, "admin", step_timer(admin, "admin", untimed))
+        timed = step_timer(admin, "admin", record)
+        for _ in range(args.admin_renders):
+            timed('admin_dashboard', admin.run)
+            if not any(header.value == "👑 Admin Dashboard" for header in admin.subheader):
+                raise RuntimeError("admin_dashboard: the admin panel did not render")
+
+        # DB operations per answer, measured on a quiet database
+        answer_ops = []
+        probe = new_app()
+        timed = step_timer(probe, "probe", untimed)
+        sign_up(probe, "probe", timed)
+        practice(probe, args.answers, args.miss_rate, random.Random(args.seed), timed, (repository, answer_ops))
+
+        print(f"{args.users} students x {args.answers} answers, {args.concurrency} concurrent, {elapsed:.1f}s")
+        print(f"{'step':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for step in LOAD_STEPS:
+            values = timings[step]
+            print(f"{step:<16}{len(values):>7}"
+                  f"{percentile(values, 50) * 1000:>10.1f}"
+                  f"{percentile(values, 95) * 1000:>10.1f}"
+                  f"{percentile(values, 99) * 1000:>10.1f}")
+        if answer_ops:
+            print(f"DB operations per answer: {statistics.mean(answer_ops):.1f} (max {max(answer_ops)})")
+    finally:
+        close_app_environment(tmp_dir, repository)
+
+
+def bench_logins(args):
+    """Verified logins per second at a given scrypt cost, with and without the credential cache"""
+    from auth import Authenticator
+
+    tmp_dir, repository = temp_repository()
+    try:
+        authenticator = Authenticator(repository, log_n=args.cost, workers=args.threads)
+        users = [f"user{i}" for i in range(args.users)]
+        started = time.perf_counter()
+        for user in users:
+            authenticator.register(user, "password")
+        print(f"registered {len(users)} users at log2(N)={args.cost} in {time.perf_counter() - started:.2f}s")
+
+        rng = random.Random(args.seed)
+        attempts = [(rng.choice(users), "password" if rng.random() >= args.miss_rate else "wrong")
+                    for _ in range(args.logins)]
+
+        ttl = authenticator.cache.ttl
+        for cached in (False, True):
+            authenticator.cache.ttl = ttl if cached else 0
+            queries = repository.queries
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                results = list(executor.map(lambda a: authenticator.verify(*a), attempts))
+            elapsed = time.perf_counter() - started
+            label = "credential cache" if cached else "no cache"
+            print(f"{label}: {len(results)} logins in {elapsed:.2f}s, {len(results) / elapsed:.1f} logins/sec, "
+                  f"{sum(results)} accepted, {repository.queries - queries} DB queries")
+    finally:
+        repository.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def import_profile(module):
+    """Import a module in a fresh interpreter: (total µs, {module: cumulative µs}, lazy modules loaded)"""
+    code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=os.path.dirname(APP_PATH), check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line.split('|')
+        cumulative[name.strip()] = int(total)
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return cumulative.get(module, 0), cumulative, loaded
+
+
+def bench_imports(args):
+    """Cold import time of the app module against a budget, and which heavy dependencies it pulls in"""
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [total for total, _, _ in runs]
+    median = statistics.median(totals) / 1000
+    _, cumulative, loaded = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"import {args.module}: median {median:.1f}ms over {args.runs} runs "
+          f"(min {min(totals) / 1000:.1f}ms, max {max(totals) / 1000:.1f}ms), budget {args.budget_ms:.0f}ms")
+    print(f"heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+    print(f"{'module':<40}{'cumulative ms':>15}")
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+    for name, total in slowest[:args.top]:
+        print(f"{name:<40}{total / 1000:>15.1f}")
+    return 1 if median > args.budget_ms else 0
+
+
+def bench_analytics(args):
+    """Attempt-log insert rate and cross-user difficulty and trend query times over a large log"""
+    tmp_dir, repository = temp_repository()
+    try:
+        rng = random.Random(args.seed)
+        words = [f"word{i}" for i in range(args.words)]
+        # Some words are much harder than others
+        difficulty = {word: rng.betavariate(2, 5) for word in words}
+        users = [f"student{i}" for i in range(args.users)]
+        tenant_id = repository.create_tenant("bench")
+        classes = [repository.create_classroom(tenant_id, f"class{i}") for i in range(args.classes)]
+        for i, user in enumerate(users):
+            repository.add_class_member(classes[i % len(classes)], user)
+
+        now = time.time()
+        span = args.days * 86400
+        written = 0
+        started = time.perf_counter()
+        while written < args.attempts:
+            batch = []
+            for _ in range(min(args.batch_size, args.attempts - written)):
+                word = rng.choice(words)
+                correct = rng.random() >= difficulty[word]
+                batch.append((rng.choice(users), word, word if correct else word[::-1], int(correct),
+                              rng.randint(1500, 12000), now - rng.random() * span))
+            repository.log_attempts(batch)
+            written += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"logged {written} attempts in batches of {args.batch_size}: "
+              f"{elapsed:.1f}s, {written / elapsed:.0f} attempts/sec")
+
+        since = time.strftime('%Y-%m-%d', time.gmtime(now - 7 * 86400))
+        queries = {
+            'hardest_words': lambda: repository.hardest_words(20),
+            'class_trend (7 days)': lambda: repository.class_trend(rng.choice(classes), since),
+            'user_trend (7 days)': lambda: repository.user_trend(rng.choice(users), since),
+            'word_history': lambda: repository.word_history(rng.choice(users), rng.choice(words)),
+        }
+        print(f"{'query':<24}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, query in queries.items():
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                query()
+                times.append(time.perf_counter() - start)
+            print(f"{name:<24}{percentile(times, 50) * 1000:>10.2f}{percentile(times, 95) * 1000:>10.2f}")
+    finally:
+        repository.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def fresh(word):
+    # A separate string object, as each row read from the database is
+    return word.encode().decode()
+
+
+def bench_memory(args):
+    """Bytes of game state per logged-in session mid-round, in the old and the memory-lean layouts"""
+    word_list = WordList("bench", 1, "0" * 64, [f"word{i}" for i in range(args.words)])
+    # Built outside the measurements: it is shared by every session in the process
+    entries = word_list.entries
+    audio_key = AudioCache.make_key(word_list.words[0], 'en', False, 'gtts')
+
+    def session(rng, lean):
+        progress = {fresh(word): rng.randint(1, 4) for word in rng.sample(word_list.words, args.practiced)}
+        queue = DueQueue()
+        now = time.time()
+        for word, attempts in progress.items():
+            queue.update(fresh(word), review(None, quality_for(FIRST_TRY if attempts == 1 else RETRY), now))
+        summary = ProgressSummary.from_stats(progress)
+        round_entries = rng.sample(entries, args.round_size)
+        state = {'progress_summary': summary, 'due_queue': queue, 'dirty_words': set(), 'word_count': 0,
+                 'attempts': 0, 'practice_mode': True, 'current_word': round_entries[0][1]}
+        if lean:
+            state['word_stats'] = summary.attempts
+            state['current_words'] = array('I', (num for num, _ in round_entries))
+            state['current_audio'] = audio_key
+        else:
+            # A second word -> attempts dict, the round as tuples and the word's MP3 bytes
+            state['word_stats'] = progress
+            state['current_words'] = list(round_entries)
+            state['current_audio'] = bytes(args.audio_bytes)
+        return state
+
+    print(f"{args.sessions} sessions, {args.practiced} practised words each, {args.round_size}-word rounds")
+    print(f"{'layout':<24}{'bytes/session':>15}")
+    for name, lean in (('before', False), ('after', True)):
+        rng = random.Random(args.seed)
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        sessions = [session(rng, lean) for _ in range(args.sessions)]
+        print(f"{name:<24}{(tracemalloc.get_traced_memory()[0] - baseline) / args.sessions:>15,.0f}")
+        if lean:
+            # Every key the benchmark sets is one the app drops from idle sessions
+            evictor = IdleSessionEvictor(list(sessions[0]), timeout=0)
+            for i, state in enumerate(sessions):
+                evictor.touch(i, state, now=0)
+            evictor.sweep(now=1)
+            print(f"{'after, idle and evicted':<24}{(tracemalloc.get_traced_memory()[0] - baseline) / args.sessions:>15,.0f}")
+        tracemalloc.stop()
+        del sessions
+
+
+BENCHMARKS = {
+    'feedback': bench_feedback,
+    'load': bench_load,
+    'logins': bench_logins,
+    'imports': bench_imports,
+    'analytics': bench_analytics,
+    'memory': bench_memory,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spelling Bee benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    feedback = subparsers.add_parser('feedback', help=bench_feedback.__doc__)
+    feedback.add_argument('--sessions', type=int, default=5)
+    feedback.add_argument('--words', type=int, default=10)
+    feedback.add_argument('--think-time', type=float, default=8.0,
+                          help="Seconds a student spends per answer")
+    feedback.add_argument('--timeout', type=float, default=30.0)
+    feedback.add_argument('--seed', type=int, default=1)
+
+    load = subparsers.add_parser('load', help=bench_load.__doc__)
+    load.add_argument('--users', type=int, default=20)
+    load.add_argument('--answers', type=int, default=10)
+    load.add_argument('--concurrency', type=int, default=4)
+    load.add_argument('--miss-rate', type=float, default=0.2)
+    load.add_argument('--admin-renders', type=int, default=5)
+    load.add_argument('--timeout', type=float, default=30.0)
+    load.add_argument('--seed', type=int, default=1)
+
+    logins = subparsers.add_parser('logins', help=bench_logins.__doc__)
+    logins.add_argument('--cost', type=int, default=14, help="scrypt log2(N)")
+    logins.add_argument('--users', type=int, default=50)
+    logins.add_argument('--logins', type=int, default=200)
+    logins.add_argument('--threads', type=int, default=os.cpu_count() or 2)
+    logins.add_argument('--miss-rate', type=float, default=0.1)
+    logins.add_argument('--seed', type=int, default=1)
+
+    imports = subparsers.add_parser('imports', help=bench_imports.__doc__)
+    imports.add_argument('--module', default='spelling_app')
+    imports.add_argument('--runs', type=int, default=5)
+    imports.add_argument('--budget-ms', type=float, default=1500.0,
+                         help="Exit non-zero when the median import time exceeds this")
+    imports.add_argument('--top', type=int, default=15, help="Slowest modules to list")
+
+    analytics = subparsers.add_parser('analytics', help=bench_analytics.__doc__)
+    analytics.add_argument('--attempts', type=int, default=1_000_000)
+    analytics.add_argument('--users', type=int, default=2000)
+    analytics.add_argument('--classes', type=int, default=80)
+    analytics.add_argument('--words', type=int, default=5000)
+    analytics.add_argument('--days', type=int, default=60)
+    analytics.add_argument('--batch-size', type=int, default=5000)
+    analytics.add_argument('--repeats', type=int, default=50)
+    analytics.add_argument('--seed', type=int, default=1)
+
+    memory = subparsers.add_parser('memory', help=bench_memory.__doc__)
+    memory.add_argument('--sessions', type=int, default=2000)
+    memory.add_argument('--words', type=int, default=5000)
+    memory.add_argument('--practiced', type=int, default=300)
+    memory.add_argument('--round-size', type=int, default=50)
+    memory.add_argument('--audio-bytes', type=int, default=12_000, help="Size of one word's MP3")
+    memory.add_argument('--seed', type=int, default=1)
+
+    args = parser.parse_args()
+    return BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Command-line tools, run as: python -m spelling_app <command> [options]"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audio_cache import AudioCache, get_audio_cache
+from tts import get_backend
+from db import get_repository
+from word_lists import DEFAULT_LIST, DEFAULT_LIST_PATH, get_word_list_store, import_word_list, iter_word_chunks, \
+    tenant_list_name
+
+PRERENDER_CHUNK_SIZE = 16
+
+
+def _render_chunk(backend_name, words, lang, slow):
+    # Runs in a worker process
+    return get_backend(backend_name).synthesize_many(words, lang, slow)
+
+
+def prerender(args):
+    """Render audio for every word in a list into the audio cache"""
+    cache = AudioCache(args.cache_dir) if args.cache_dir else get_audio_cache()
+    backend = get_backend(args.backend)
+
+    # Already-cached words are skipped, so an interrupted run resumes where it stopped
+    words = []
+    skipped = 0
+    for chunk in iter_word_chunks(args.list):
+        for word, _, _ in chunk:
+            if cache.contains(AudioCache.make_key(word, args.lang, args.slow, backend.engine)):
+                skipped += 1
+            else:
+                words.append(word)
+
+    print(f"{len(words)} words to render, {skipped} already cached ({backend.engine}, {args.workers} workers)")
+    rendered = failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(_render_chunk, backend.name, words[i:i + args.chunk_size], args.lang, args.slow):
+                words[i:i + args.chunk_size]
+            for i in range(0, len(words), args.chunk_size)
+        }
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                failed += len(futures[future])
+                print(f"  failed {len(futures[future])} words: {e}")
+                continue
+            for word, data in results.items():
+                if data:
+                    cache.put(AudioCache.make_key(word, args.lang, args.slow, backend.engine), data, backend.extension)
+                    rendered += 1
+                else:
+                    failed += 1
+            elapsed = time.perf_counter() - started
+            print(f"  {rendered + failed}/{len(words)} words, {rendered / elapsed:.1f} words/sec", flush=True)
+
+    elapsed = time.perf_counter() - started
+    rate = rendered / elapsed if elapsed else 0.0
+    print(f"Rendered {rendered} words in {elapsed:.1f}s ({rate:.1f} words/sec), "
+          f"{skipped} skipped, {failed} failed")
+    return 1 if failed else 0
+
+
+def add_class(args):
+    """Create a tenant's classroom, optionally importing the word list it practices"""
+    repository = get_repository()
+    tenant_id = repository.create_tenant(args.tenant)
+    word_list = args.list
+    if args.list_file:
+        word_list = tenant_list_name(args.tenant, args.list or args.name)
+        _, count = import_word_list(word_list, args.list_file, repository, tenant_id=tenant_id)
+        print(f"Imported {count} words as {word_list}")
+    class_id = repository.create_classroom(tenant_id, args.name, word_list)
+    print(f"Class {class_id}: {args.tenant} / {args.name} (word list: {word_list or 'default'})")
+    return 0
+
+
+def enroll(args):
+    """Add users to a classroom as students or teachers"""
+    repository = get_repository()
+    class_id = repository.get_classroom(args.tenant, args.name)
+    if class_id is None:
+        print(f"No class {args.name} in {args.tenant}; create it with add-class")
+        return 1
+    for user in args.users:
+        if args.remove:
+            repository.remove_class_member(class_id, user)
+        else:
+            repository.add_class_member(class_id, user, args.role)
+    action = "Removed" if args.remove else f"Enrolled as {args.role}"
+    print(f"{action}: {', '.join(args.users)} ({args.tenant} / {args.name})")
+    return 0
+
+
+def set_role(args):
+    """Set a registered user's role (admin sees the whole-instance dashboard)"""
+    if not get_repository().set_user_role(args.user, args.role):
+        print(f"No registered user named {args.user}")
+        return 1
+    print(f"{args.user} is now {args.role}")
+    return 0
+
+
+def analyze_misses(args):
+    """Analyse wrong answers logged since the last run into per-student and per-class error patterns"""
+    from misspellings import refresh_error_patterns
+
+    started = time.perf_counter()
+    word_list = get_word_list_store().get(args.list)
+    processed = refresh_error_patterns(get_repository(), word_list, args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(f"Analysed {processed} misses in {elapsed:.1f}s")
+    return 0
+
+
+def score_words(args):
+    """Precompute difficulty scores for a word list from its words and everyone's progress"""
+    from difficulty import refresh_scores
+
+    started = time.perf_counter()
+    word_list = get_word_list_store().get(args.list)
+    scores = refresh_scores(get_repository(), word_list)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {len(scores)} words in {word_list.name} in {elapsed:.1f}s")
+    return 0
+
+
+COMMANDS = {
+    'prerender': prerender,
+    'add-class': add_class,
+    'enroll': enroll,
+    'set-role': set_role,
+    'analyze-misses': analyze_misses,
+    'score-words': score_words,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spelling_app", description="Spelling Bee tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render = subparsers.add_parser('prerender', help=prerender.__doc__)
+    render.add_argument('--list', default=DEFAULT_LIST_PATH, help="CSV, TSV or text word list")
+    render.add_argument('--workers', type=int, default=4)
+    render.add_argument('--backend', default=None, help="TTS backend (default: $SPELLING_TTS_BACKEND or gtts)")
+    render.add_argument('--lang', default='en')
+    render.add_argument('--slow', action='store_true')
+    render.add_argument('--chunk-size', type=int, default=PRERENDER_CHUNK_SIZE)
+    render.add_argument('--cache-dir', default=None, help="Audio cache directory (default: the app's cache)")
+
+    classroom = subparsers.add_parser('add-class', help=add_class.__doc__)
+    classroom.add_argument('--tenant', required=True, help="School the class belongs to")
+    classroom.add_argument('--name', required=True)
+    classroom.add_argument('--list', default=None, help="Word list name (default: the shared list)")
+    classroom.add_argument('--list-file', default=None, help="CSV, TSV or text file to import as the tenant's list")
+
+    members = subparsers.add_parser('enroll', help=enroll.__doc__)
+    members.add_argument('--tenant', required=True)
+    members.add_argument('--name', required=True, help="Class name")
+    members.add_argument('--role', choices=('student', 'teacher'), default='student')
+    members.add_argument('--remove', action='store_true', help="Remove the users from the class instead")
+    members.add_argument('users', nargs='+')
+
+    role = subparsers.add_parser('set-role', help=set_role.__doc__)
+    role.add_argument('--user', required=True)
+    role.add_argument('--role', choices=('student', 'admin'), required=True)
+
+    analysis = subparsers.add_parser('analyze-misses', help=analyze_misses.__doc__)
+    analysis.add_argument('--list', default=DEFAULT_LIST, help="Word list used to spot answers that are other words")
+    analysis.add_argument('--batch-size', type=int, default=5000)
+
+    scoring = subparsers.add_parser('score-words', help=score_words.__doc__)
+    scoring.add_argument('--list', default=DEFAULT_LIST)
+
+    args = parser.parse_args(argv)
+    return COMMANDS[args.command](args)
@@ -0,0 +1,1025 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRESS_DB = os.path.join(SCRIPT_DIR, "spelling_progress.db")
+USERS_DB = os.path.join(SCRIPT_DIR, "users.db")
+
+DEFAULT_POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 128
+# Set SPELLING_WRITE_BEHIND=1 to batch progress writes from all sessions
+WRITE_BEHIND = os.environ.get("SPELLING_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_INTERVAL = 1.0  # Seconds between batched commits
+# Attempt-log rows held while the database refuses them; the oldest are dropped past this
+ATTEMPT_LOG_MAX_PENDING = 100_000
+
+
+class CountingConnection(sqlite3.Connection):
+    """Connection that reports each execute()/executemany() call to on_query"""
+    on_query = None
+
+    def execute(self, *args, **kwargs):
+        if self.on_query:
+            self.on_query()
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        if self.on_query:
+            self.on_query()
+        return super().executemany(*args, **kwargs)
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections in WAL mode, shared across threads"""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.queries = 0  # execute()/executemany() calls made through the pool
+
+    def _connect(self):
+        # cached_statements keeps prepared statements around between calls
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=CountingConnection,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.on_query = self._count_query
+        metrics.increment('spelling_db_connections_total')
+        return conn
+
+    def _count_query(self):
+        with self._lock:
+            self.queries += 1
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+class SpellingRepository:
+    """All database access for the app, on top of one pool per database file"""
+
+    def __init__(self, progress_db=PROGRESS_DB, users_db=USERS_DB, pool_size=DEFAULT_POOL_SIZE):
+        self.progress_pool = ConnectionPool(progress_db, pool_size)
+        self.users_pool = ConnectionPool(users_db, pool_size)
+        self.setup_schema()
+
+    def setup_schema(self):
+        with self.progress_pool.connection() as conn:
+            # Create progress table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS progress
+                (user_id TEXT,
+                 word TEXT,
+                 attempts INTEGER,
+                 last_practiced TEXT,
+                 PRIMARY KEY (user_id, word))
+            ''')
+
+            # Per-user rollup for the admin dashboard, maintained by triggers
+            rollup_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_rollup'"
+            ).fetchone()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_rollup
+                (user_id TEXT PRIMARY KEY,
+                 is_guest INTEGER,
+                 words INTEGER,
+                 perfect INTEGER,
+                 last_active TEXT)
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_user_rollup_perfect ON user_rollup (perfect DESC)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_user_rollup_guest ON user_rollup (is_guest)')
+            if not rollup_exists:
+                conn.execute('''
+                    INSERT INTO user_rollup (user_id, is_guest, words, perfect, last_active)
+                    SELECT user_id, substr(user_id, 1, 6) = 'guest_', COUNT(*),
+                           COUNT(CASE WHEN attempts = 1 THEN 1 END), MAX(last_practiced)
+                    FROM progress
+                    GROUP BY user_id
+                ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS user_rollup_insert
+                AFTER INSERT ON progress
+                BEGIN
+                    INSERT INTO user_rollup (user_id, is_guest, words, perfect, last_active)
+                    VALUES (NEW.user_id, substr(NEW.user_id, 1, 6) = 'guest_', 1,
+                            NEW.attempts = 1, NEW.last_practiced)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        words = words + 1,
+                        perfect = perfect + excluded.perfect,
+                        last_active = MAX(last_active, excluded.last_active);
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS user_rollup_update
+                AFTER UPDATE ON progress
+                BEGIN
+                    UPDATE user_rollup SET
+                        perfect = perfect - (OLD.attempts = 1) + (NEW.attempts = 1),
+                        last_active = MAX(last_active, NEW.last_practiced)
+                    WHERE user_id = NEW.user_id;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS user_rollup_delete
+                AFTER DELETE ON progress
+                BEGIN
+                    UPDATE user_rollup SET
+                        words = words - 1,
+                        perfect = perfect - (OLD.attempts = 1)
+                    WHERE user_id = OLD.user_id;
+                END
+            ''')
+
+            # Create sessions table; state holds the packed session (see
+            # session_format.py), current_words is only read from older rows
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions
+                (user_id TEXT PRIMARY KEY,
+                 current_words TEXT,
+                 word_count INTEGER,
+                 last_updated TEXT,
+                 state BLOB)
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(sessions)')}
+            if 'state' not in columns:
+                conn.execute('ALTER TABLE sessions ADD COLUMN state BLOB')
+
+        with self.progress_pool.connection() as conn:
+            # Spaced-repetition state; due is a unix timestamp
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schedule
+                (user_id TEXT,
+                 word TEXT,
+                 ease REAL,
+                 interval INTEGER,
+                 repetitions INTEGER,
+                 due REAL,
+                 PRIMARY KEY (user_id, word))
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_schedule_due ON schedule (user_id, due)')
+
+            # Imported word lists; (list_id, position) is the primary key so
+            # range selection is an index lookup
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS word_lists
+                (list_id INTEGER PRIMARY KEY,
+                 name TEXT UNIQUE,
+                 source TEXT,
+                 digest TEXT,
+                 word_count INTEGER,
+                 imported_at TEXT)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS list_words
+                (list_id INTEGER,
+                 position INTEGER,
+                 word TEXT,
+                 difficulty INTEGER,
+                 grade INTEGER,
+                 PRIMARY KEY (list_id, position))
+            ''')
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_list_words_word ON list_words (list_id, word)')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(list_words)')}
+            if 'score' not in columns:
+                # Precomputed difficulty (see difficulty.py); NULL until scored
+                conn.execute('ALTER TABLE list_words ADD COLUMN score REAL')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_list_words_score ON list_words (list_id, score, position, word)')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(word_lists)')}
+            if 'tenant_id' not in columns:
+                # NULL for lists shared by every tenant
+                conn.execute('ALTER TABLE word_lists ADD COLUMN tenant_id INTEGER')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_word_lists_tenant ON word_lists (tenant_id, name)')
+
+            # Schools (tenants) own classrooms; a classroom practices one word
+            # list. Members are keyed by class first so a class's roster,
+            # leaderboard and progress are range scans over that class only
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tenants
+                (tenant_id INTEGER PRIMARY KEY,
+                 name TEXT UNIQUE,
+                 created_at TEXT)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS classrooms
+                (class_id INTEGER PRIMARY KEY,
+                 tenant_id INTEGER,
+                 name TEXT,
+                 word_list TEXT,
+                 created_at TEXT,
+                 UNIQUE (tenant_id, name))
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS class_members
+                (class_id INTEGER,
+                 user_id TEXT,
+                 role TEXT,
+                 joined_at TEXT,
+                 PRIMARY KEY (class_id, user_id)) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_class_members_user ON class_members (user_id, class_id)')
+
+        with self.progress_pool.connection() as conn:
+            # Append-only log of every submitted answer; ts is a unix timestamp.
+            # Both indexes cover the analytics columns so history and trend
+            # queries never touch the table itself
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS attempt_log
+                (attempt_id INTEGER PRIMARY KEY,
+                 user_id TEXT,
+                 word TEXT,
+                 typed TEXT,
+                 correct INTEGER,
+                 latency_ms INTEGER,
+                 ts REAL)
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_attempt_log_user ON attempt_log (user_id, ts, word, correct)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_attempt_log_word ON attempt_log (word, ts, correct)')
+
+            # Rollups of the log, kept current by the trigger below: totals per
+            # word across all students, and per user per (UTC) day
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS word_difficulty
+                (word TEXT PRIMARY KEY,
+                 attempts INTEGER,
+                 misses INTEGER,
+                 latency_ms INTEGER,
+                 last_ts REAL)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS daily_attempts
+                (user_id TEXT,
+                 day TEXT,
+                 attempts INTEGER,
+                 correct INTEGER,
+                 latency_ms INTEGER,
+                 PRIMARY KEY (user_id, day)) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS attempt_log_insert
+                AFTER INSERT ON attempt_log
+                BEGIN
+                    INSERT INTO word_difficulty (word, attempts, misses, latency_ms, last_ts)
+                    VALUES (NEW.word, 1, NEW.correct = 0, COALESCE(NEW.latency_ms, 0), NEW.ts)
+                    ON CONFLICT (word) DO UPDATE SET
+                        attempts = attempts + 1,
+                        misses = misses + excluded.misses,
+                        latency_ms = latency_ms + excluded.latency_ms,
+                        last_ts = MAX(last_ts, excluded.last_ts);
+                    INSERT INTO daily_attempts (user_id, day, attempts, correct, latency_ms)
+                    VALUES (NEW.user_id, date(NEW.ts, 'unixepoch'), 1, NEW.correct, COALESCE(NEW.latency_ms, 0))
+                    ON CONFLICT (user_id, day) DO UPDATE SET
+                        attempts = attempts + 1,
+                        correct = correct + excluded.correct,
+                        latency_ms = latency_ms + excluded.latency_ms;
+                END
+            ''')
+
+            # Results of the misspelling analysis (see misspellings.py), which
+            # works through the log's misses in batches after a watermark
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS error_patterns
+                (user_id TEXT,
+                 pattern TEXT,
+                 misses INTEGER,
+                 PRIMARY KEY (user_id, pattern)) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS misspellings
+                (word TEXT,
+                 typed TEXT,
+                 count INTEGER,
+                 distance INTEGER,
+                 patterns TEXT,
+                 PRIMARY KEY (word, typed)) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS watermarks
+                (name TEXT PRIMARY KEY,
+                 last_id INTEGER)
+            ''')
+
+        with self.users_pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users
+                (username TEXT PRIMARY KEY,
+                 password_hash TEXT,
+                 created_at TEXT,
+                 role TEXT DEFAULT 'student')
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+            if 'role' not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'student'")
+                # Admin used to be whoever registered as "admin"; keep that account's access
+                conn.execute("UPDATE users SET role = 'admin' WHERE username = 'admin'")
+
+    def close(self):
+        self.progress_pool.close()
+        self.users_pool.close()
+
+    @property
+    def queries(self):
+        return self.progress_pool.queries + self.users_pool.queries
+
+    # Progress
+
+    def load_progress(self, user_id):
+        with self.progress_pool.connection() as conn:
+            rows = conn.execute('SELECT word, attempts FROM progress WHERE user_id = ?',
+                                (user_id,)).fetchall()
+        return {word: attempts for word, attempts in rows}
+
+    def save_progress(self, user_id, word_stats):
+        """Upsert only the given {word: attempts} entries, stamped with the current time"""
+        now = datetime.now().isoformat()
+        self.save_progress_rows([(user_id, word, attempts, now) for word, attempts in word_stats.items()])
+
+    def save_progress_rows(self, rows):
+        """Upsert (user_id, word, attempts, last_practiced) rows in a single transaction"""
+        if not rows:
+            return
+        with self.progress_pool.connection() as conn:
+            self._upsert_progress(conn, rows)
+
+    def save_answers(self, progress_rows, schedule_rows):
+        """Upsert progress rows and (user_id, word, ease, interval, repetitions, due) schedule
+        rows together in one transaction"""
+        if not progress_rows and not schedule_rows:
+            return
+        with self.progress_pool.connection() as conn:
+            self._upsert_progress(conn, progress_rows)
+            self._upsert_schedule(conn, schedule_rows)
+
+    @staticmethod
+    def _upsert_progress(conn, rows):
+        # Upsert rather than REPLACE so the rollup triggers see an UPDATE
+        conn.executemany('''
+            INSERT INTO progress
+            (user_id, word, attempts, last_practiced)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, word) DO UPDATE SET
+                attempts = excluded.attempts,
+                last_practiced = excluded.last_practiced
+        ''', rows)
+
+    # Spaced repetition
+
+    def load_schedule(self, user_id):
+        """{word: (ease, interval, repetitions, due)} for one user"""
+        with self.progress_pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT word, ease, interval, repetitions, due FROM schedule WHERE user_id = ?
+            ''', (user_id,)).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def save_schedule_rows(self, rows):
+        """Upsert (user_id, word, ease, interval, repetitions, due) rows in one transaction"""
+        if not rows:
+            return
+        with self.progress_pool.connection() as conn:
+            self._upsert_schedule(conn, rows)
+
+    @staticmethod
+    def _upsert_schedule(conn, rows):
+        conn.executemany('''
+            INSERT OR REPLACE INTO schedule
+            (user_id, word, ease, interval, repetitions, due)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+    def count_due(self, user_id, until):
+        with self.progress_pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM schedule WHERE user_id = ? AND due <= ?',
+                                (user_id, until)).fetchone()[0]
+
+    # Sessions
+
+    def save_session(self, user_id, state, word_count):
+        with self.progress_pool.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO sessions
+                (user_id, current_words, word_count, last_updated, state)
+                VALUES (?, NULL, ?, ?, ?)
+            ''', (user_id, word_count, datetime.now().isoformat(), state))
+
+    def load_session(self, user_id):
+        """(state, legacy current_words, word_count, last_updated) or None"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT state, current_words, word_count, last_updated
+                FROM sessions
+                WHERE user_id = ?
+            ''', (user_id,)).fetchone()
+
+    def delete_session(self, user_id):
+        with self.progress_pool.connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+
+    # Word lists
+
+    def get_word_list(self, name):
+        """(list_id, digest, word_count) for the named list, or None"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('SELECT list_id, digest, word_count FROM word_lists WHERE name = ?',
+                                (name,)).fetchone()
+
+    def replace_word_list(self, name, source, digest, chunks, tenant_id=None):
+        """Store chunks of (word, difficulty, grade) rows as the named list, in one transaction"""
+        with self.progress_pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO word_lists (name, source, digest, word_count, imported_at, tenant_id)
+                VALUES (?, ?, NULL, 0, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET source = excluded.source
+            ''', (name, source, datetime.now().isoformat(), tenant_id))
+            list_id = conn.execute('SELECT list_id FROM word_lists WHERE name = ?', (name,)).fetchone()[0]
+            conn.execute('DELETE FROM list_words WHERE list_id = ?', (list_id,))
+
+            count = 0
+            for chunk in chunks:
+                conn.executemany('''
+                    INSERT INTO list_words (list_id, position, word, difficulty, grade)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(list_id, count + i, word, difficulty, grade)
+                      for i, (word, difficulty, grade) in enumerate(chunk, 1)])
+                count += len(chunk)
+
+            conn.execute('''
+                UPDATE word_lists SET digest = ?, word_count = ?, imported_at = ?
+                WHERE list_id = ?
+            ''', (digest, count, datetime.now().isoformat(), list_id))
+        return list_id, count
+
+    def load_list_words(self, list_id):
+        with self.progress_pool.connection() as conn:
+            return [row[0] for row in conn.execute(
+                'SELECT word FROM list_words WHERE list_id = ? ORDER BY position', (list_id,))]
+
+    def list_words_range(self, list_id, start, end):
+        """(position, word) for positions start..end inclusive"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT position, word FROM list_words
+                WHERE list_id = ? AND position BETWEEN ? AND ?
+                ORDER BY position
+            ''', (list_id, start, end)).fetchall()
+
+    def word_miss_stats(self):
+        """(word, students, students who needed more than one try) from everyone's progress"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT word, COUNT(*), SUM(attempts > 1) FROM progress GROUP BY word
+            ''').fetchall()
+
+    def save_word_scores(self, list_id, rows):
+        """Store (score, position) difficulty scores for a list, in one transaction"""
+        with self.progress_pool.connection() as conn:
+            conn.executemany('UPDATE list_words SET score = ? WHERE list_id = ? AND position = ?',
+                             [(score, list_id, position) for score, position in rows])
+
+    def has_scores(self, list_id):
+        with self.progress_pool.connection() as conn:
+            row = conn.execute('SELECT 1 FROM list_words WHERE list_id = ? AND score IS NOT NULL LIMIT 1',
+                               (list_id,)).fetchone()
+        return row is not None
+
+    def words_in_band(self, list_id, after, high, limit):
+        """Up to limit (position, word, score) with score <= high, in (score, position) order
+        after the (score, position) key after; each page is one seek on the (list_id, score) index"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT position, word, score FROM list_words
+                WHERE list_id = ? AND (score, position) > (?, ?) AND score <= ?
+                ORDER BY score, position
+                LIMIT ?
+            ''', (list_id, after[0], after[1], high, limit)).fetchall()
+
+    # Users
+
+    def user_exists(self, username):
+        with self.users_pool.connection() as conn:
+            row = conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone()
+        return row is not None
+
+    def create_user(self, username, password_hash):
+        with self.users_pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO users (username, password_hash, created_at)
+                VALUES (?, ?, ?)
+            ''', (username, password_hash, datetime.now().isoformat()))
+
+    def get_password_hash(self, username):
+        with self.users_pool.connection() as conn:
+            row = conn.execute('SELECT password_hash FROM users WHERE username = ?',
+                               (username,)).fetchone()
+        return row[0] if row else None
+
+    def update_password_hash(self, username, password_hash):
+        with self.users_pool.connection() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE username = ?', (password_hash, username))
+
+    def get_user_role(self, username):
+        with self.users_pool.connection() as conn:
+            row = conn.execute('SELECT role FROM users WHERE username = ?', (username,)).fetchone()
+        return row[0] if row else None
+
+    def set_user_role(self, username, role):
+        with self.users_pool.connection() as conn:
+            return conn.execute('UPDATE users SET role = ? WHERE username = ?', (role, username)).rowcount
+
+    def count_registered_users(self):
+        with self.users_pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def count_users_with_progress(self, guests_only=False):
+        with self.progress_pool.connection() as conn:
+            if guests_only:
+                return conn.execute('SELECT COUNT(*) FROM user_rollup WHERE is_guest = 1').fetchone()[0]
+            return conn.execute('SELECT COUNT(*) FROM user_rollup').fetchone()[0]
+
+    def user_rollups(self, limit=50, offset=0):
+        """One page of (user_id, is_guest, words, perfect, last_active), most perfect words first"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT user_id, is_guest, words, perfect,
+                       substr(replace(last_active, 'T', ' '), 1, 16)
+                FROM user_rollup
+                ORDER BY perfect DESC
+                LIMIT ? OFFSET ?
+            ''', (limit, offset)).fetchall()
+
+
+    # Attempt log
+
+    def log_attempts(self, rows):
+        """Append (user_id, word, typed, correct, latency_ms, ts) rows in one transaction"""
+        with self.progress_pool.connection() as conn:
+            conn.executemany('''
+                INSERT INTO attempt_log (user_id, word, typed, correct, latency_ms, ts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    def hardest_words(self, limit=20, min_attempts=5):
+        """(word, attempts, miss rate, mean latency ms) across all students, highest miss rate first"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT word, attempts, CAST(misses AS REAL) / attempts, latency_ms / attempts
+                FROM word_difficulty
+                WHERE attempts >= ?
+                ORDER BY CAST(misses AS REAL) / attempts DESC, attempts DESC
+                LIMIT ?
+            ''', (min_attempts, limit)).fetchall()
+
+    def user_trend(self, user_id, since_day):
+        """(day, attempts, correct, mean latency ms) per day from since_day ('YYYY-MM-DD', UTC)"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT day, attempts, correct, latency_ms / attempts
+                FROM daily_attempts
+                WHERE user_id = ? AND day >= ?
+                ORDER BY day
+            ''', (user_id, since_day)).fetchall()
+
+    def class_trend(self, class_id, since_day):
+        """(day, attempts, correct, mean latency ms) per day for a class's students"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT d.day, SUM(d.attempts), SUM(d.correct), SUM(d.latency_ms) / SUM(d.attempts)
+                FROM class_members m
+                JOIN daily_attempts d ON d.user_id = m.user_id AND d.day >= ?
+                WHERE m.class_id = ? AND m.role = 'student'
+                GROUP BY d.day
+                ORDER BY d.day
+            ''', (since_day, class_id)).fetchall()
+
+    def word_history(self, user_id, word, limit=20):
+        """(ts, typed, correct, latency_ms) of a user's most recent answers for a word"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT ts, typed, correct, latency_ms FROM attempt_log
+                WHERE user_id = ? AND word = ?
+                ORDER BY ts DESC
+                LIMIT ?
+            ''', (user_id, word, limit)).fetchall()
+
+    # Misspelling analysis
+
+    def get_watermark(self, name):
+        with self.progress_pool.connection() as conn:
+            row = conn.execute('SELECT last_id FROM watermarks WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def misses_since(self, after_id, limit):
+        """(attempt_id, user_id, word, typed) for wrong answers logged after after_id, oldest first"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT attempt_id, user_id, word, typed FROM attempt_log
+                WHERE attempt_id > ? AND correct = 0
+                ORDER BY attempt_id
+                LIMIT ?
+            ''', (after_id, limit)).fetchall()
+
+    def save_miss_analysis(self, pattern_rows, misspelling_rows, watermark, last_id):
+        """Add a batch's (user_id, pattern, misses) and (word, typed, count, distance, patterns)
+        counts and advance the watermark, in one transaction"""
+        with self.progress_pool.connection() as conn:
+            conn.executemany('''
+                INSERT INTO error_patterns (user_id, pattern, misses) VALUES (?, ?, ?)
+                ON CONFLICT (user_id, pattern) DO UPDATE SET misses = misses + excluded.misses
+            ''', pattern_rows)
+            conn.executemany('''
+                INSERT INTO misspellings (word, typed, count, distance, patterns) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (word, typed) DO UPDATE SET count = count + excluded.count
+            ''', misspelling_rows)
+            conn.execute('''
+                INSERT INTO watermarks (name, last_id) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id
+            ''', (watermark, last_id))
+
+    def user_error_patterns(self, user_id):
+        """(pattern, misses) for a student, most frequent first"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT pattern, misses FROM error_patterns
+                WHERE user_id = ?
+                ORDER BY misses DESC
+            ''', (user_id,)).fetchall()
+
+    def class_error_patterns(self, class_id, limit=10):
+        """(pattern, students, misses) across a class's students, most frequent first"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT e.pattern, COUNT(*), SUM(e.misses)
+                FROM class_members m
+                JOIN error_patterns e ON e.user_id = m.user_id
+                WHERE m.class_id = ? AND m.role = 'student'
+                GROUP BY e.pattern
+                ORDER BY SUM(e.misses) DESC
+                LIMIT ?
+            ''', (class_id, limit)).fetchall()
+
+    def common_misspellings(self, word, limit=5):
+        """(typed, count, patterns) for a word's most frequent misspellings"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT typed, count, patterns FROM misspellings
+                WHERE word = ?
+                ORDER BY count DESC
+                LIMIT ?
+            ''', (word, limit)).fetchall()
+
+    # Tenants and classrooms
+
+    def create_tenant(self, name):
+        """tenant_id for the named tenant, creating it if needed"""
+        with self.progress_pool.connection() as conn:
+            conn.execute('INSERT INTO tenants (name, created_at) VALUES (?, ?) ON CONFLICT (name) DO NOTHING',
+                         (name, datetime.now().isoformat()))
+            return conn.execute('SELECT tenant_id FROM tenants WHERE name = ?', (name,)).fetchone()[0]
+
+    def create_classroom(self, tenant_id, name, word_list=None):
+        """class_id for the tenant's classroom, creating it or updating its word list"""
+        with self.progress_pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO classrooms (tenant_id, name, word_list, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (tenant_id, name) DO UPDATE SET
+                    word_list = COALESCE(excluded.word_list, word_list)
+            ''', (tenant_id, name, word_list, datetime.now().isoformat()))
+            return conn.execute('SELECT class_id FROM classrooms WHERE tenant_id = ? AND name = ?',
+                                (tenant_id, name)).fetchone()[0]
+
+    def get_classroom(self, tenant, name):
+        """class_id of the tenant's named classroom, or None"""
+        with self.progress_pool.connection() as conn:
+            row = conn.execute('''
+                SELECT c.class_id FROM classrooms c JOIN tenants t ON t.tenant_id = c.tenant_id
+                WHERE t.name = ? AND c.name = ?
+            ''', (tenant, name)).fetchone()
+        return row[0] if row else None
+
+    def add_class_member(self, class_id, user_id, role='student'):
+        with self.progress_pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO class_members (class_id, user_id, role, joined_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (class_id, user_id) DO UPDATE SET role = excluded.role
+            ''', (class_id, user_id, role, datetime.now().isoformat()))
+
+    def remove_class_member(self, class_id, user_id):
+        with self.progress_pool.connection() as conn:
+            conn.execute('DELETE FROM class_members WHERE class_id = ? AND user_id = ?', (class_id, user_id))
+
+    def user_classes(self, user_id):
+        """(class_id, tenant, class name, word list, role) for every class the user belongs to"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT c.class_id, t.name, c.name, c.word_list, m.role
+                FROM class_members m
+                JOIN classrooms c ON c.class_id = m.class_id
+                JOIN tenants t ON t.tenant_id = c.tenant_id
+                WHERE m.user_id = ?
+                ORDER BY t.name, c.name
+            ''', (user_id,)).fetchall()
+
+    def count_class_members(self, class_id, role='student'):
+        with self.progress_pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM class_members WHERE class_id = ? AND role = ?',
+                                (class_id, role)).fetchone()[0]
+
+    def class_rollups(self, class_id, limit=50, offset=0):
+        """One page of the class leaderboard: (user_id, words, perfect, last_active), most perfect first"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT m.user_id, COALESCE(r.words, 0), COALESCE(r.perfect, 0),
+                       substr(replace(r.last_active, 'T', ' '), 1, 16)
+                FROM class_members m
+                LEFT JOIN user_rollup r ON r.user_id = m.user_id
+                WHERE m.class_id = ? AND m.role = 'student'
+                ORDER BY COALESCE(r.perfect, 0) DESC, m.user_id
+                LIMIT ? OFFSET ?
+            ''', (class_id, limit, offset)).fetchall()
+
+    def class_hardest_words(self, class_id, limit=10):
+        """(word, students, mean attempts) for the class's most-missed words"""
+        with self.progress_pool.connection() as conn:
+            return conn.execute('''
+                SELECT p.word, COUNT(*), AVG(p.attempts)
+                FROM class_members m
+                JOIN progress p ON p.user_id = m.user_id
+                WHERE m.class_id = ? AND m.role = 'student'
+                GROUP BY p.word
+                HAVING AVG(p.attempts) > 1
+                ORDER BY AVG(p.attempts) DESC, COUNT(*) DESC
+                LIMIT ?
+            ''', (class_id, limit)).fetchall()
+
+
+class BatchWriter(ABC):
+    """Background thread that commits queued rows in periodic batches"""
+    name = "batch-writer"
+
+    def __init__(self, repository, interval=WRITE_BEHIND_INTERVAL):
+        self.repository = repository
+        self.interval = interval
+        self.flushes = 0
+        self.flush_failures = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    @abstractmethod
+    def _take(self):
+        """Swap out and return the queued batch; called with the lock held"""
+
+    @abstractmethod
+    def _write(self, batch):
+        """Commit one batch"""
+
+    @abstractmethod
+    def _restore(self, batch):
+        """Requeue a batch that failed to commit; called with the lock held"""
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take()
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                with self._lock:
+                    self._restore(batch)
+                raise
+            self.flushes += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # The batch was requeued and is retried on the next tick
+                self.flush_failures += 1
+                metrics.increment('spelling_batch_flush_failures_total', writer=self.name)
+                logger.exception("%s: flush failed, retrying in %ss", self.name, self.interval)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+
+class ProgressWriter(BatchWriter):
+    """Write-behind queue that coalesces progress and review schedule updates into periodic
+    batched commits"""
+    name = "progress-writer"
+
+    def __init__(self, repository, interval=WRITE_BEHIND_INTERVAL):
+        self._pending = {}  # (user_id, word) -> (attempts, last_practiced)
+        self._schedule = {}  # (user_id, word) -> (ease, interval, repetitions, due)
+        super().__init__(repository, interval)
+
+    def enqueue(self, user_id, word_stats, schedule=None):
+        """Queue {word: attempts} and optional {word: (ease, interval, repetitions, due)}"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for word, attempts in word_stats.items():
+                # Later updates for the same word replace earlier ones
+                self._pending[(user_id, word)] = (attempts, now)
+            for word, state in (schedule or {}).items():
+                self._schedule[(user_id, word)] = tuple(state)
+
+    def _take(self):
+        if not self._pending and not self._schedule:
+            return None
+        batch = (self._pending, self._schedule)
+        self._pending, self._schedule = {}, {}
+        return batch
+
+    def _write(self, batch):
+        pending, schedule = batch
+        self.repository.save_answers(
+            [(user_id, word, attempts, ts) for (user_id, word), (attempts, ts) in pending.items()],
+            [key + state for key, state in schedule.items()])
+
+    def _restore(self, batch):
+        # Put the batch back without overwriting anything newer
+        for queued, failed in zip((self._pending, self._schedule), batch):
+            for key, value in failed.items():
+                queued.setdefault(key, value)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending) + len(self._schedule)
+
+
+class AttemptLogWriter(BatchWriter):
+    """Appends answers to the attempt log in batches, so a submit never waits on the insert"""
+    name = "attempt-log-writer"
+
+    def __init__(self, repository, interval=WRITE_BEHIND_INTERVAL, max_pending=ATTEMPT_LOG_MAX_PENDING):
+        self._pending = []  # (user_id, word, typed, correct, latency_ms, ts)
+        self.max_pending = max_pending
+        self.dropped = 0
+        super().__init__(repository, interval)
+
+    def enqueue(self, user_id, word, typed, correct, latency_ms, ts=None):
+        with self._lock:
+            self._pending.append((user_id, word, typed, int(correct), latency_ms, ts or time.time()))
+
+    def _take(self):
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _write(self, rows):
+        self.repository.log_attempts(rows)
+
+    def _restore(self, rows):
+        self._pending[:0] = rows
+        # A database that stays down must not grow memory without bound
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            metrics.increment('spelling_attempt_log_dropped_total', overflow)
+            logger.warning("%s: dropped the %d oldest rows the database would not take", self.name, overflow)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+
+_repository = None
+_writer = None
+_attempt_log = None
+_repository_lock = threading.Lock()
+
+metrics.register_gauge('spelling_db_queries_total', lambda: _repository.queries if _repository else 0, kind='counter')
+
+
+def set_repository(repository):
+    """Replace the process-wide repository, e.g. with one on a temporary database"""
+    global _repository
+    with _repository_lock:
+        _repository = repository
+
+
+def get_repository():
+    """Process-wide repository shared by every Streamlit session"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = SpellingRepository()
+    return _repository
+
+
+def get_progress_writer():
+    """Process-wide write-behind queue, or None when SPELLING_WRITE_BEHIND is off"""
+    global _writer
+    if not WRITE_BEHIND:
+        return None
+    if _writer is None:
+        repository = get_repository()
+        with _repository_lock:
+            if _writer is None:
+                _writer = ProgressWriter(repository)
+    return _writer
+
+
+def close_progress_writer():
+    """Flush and stop the write-behind queue; the next get_progress_writer() starts a new one"""
+    global _writer
+    with _repository_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def get_attempt_log():
+    """Process-wide attempt log writer, flushed on exit or by close_attempt_log()"""
+    global _attempt_log
+    if _attempt_log is None:
+        repository = get_repository()
+        with _repository_lock:
+            if _attempt_log is None:
+                _attempt_log = AttemptLogWriter(repository)
+    return _attempt_log
+
+
+def close_attempt_log():
+    """Flush and stop the attempt log writer, e.g. before its database is removed"""
+    global _attempt_log
+    with _repository_lock:
+        writer, _attempt_log = _attempt_log, None
+    if writer is not None:
+        writer.close()
+
+
+# Whatever is still queued is written on exit
+atexit.register(close_progress_writer)
+atexit.register(close_attempt_log)
@@ -0,0 +1,86 @@
+"""Difficulty scores for whole word lists
+
+Each word gets a 0-100 score from its length, how unusual its letter pairs
+are within the list, an estimated syllable count and how often students
+have missed it. Scores are stored on list_words, and practice draws words
+from a score band through the (list_id, score) index.
+"""
+import math
+import re
+from collections import Counter
+
+# Weights of the normalised features; they sum to 1
+WEIGHTS = {'length': 0.25, 'rarity': 0.25, 'syllables': 0.2, 'miss_rate': 0.3}
+MAX_LENGTH = 15
+MAX_SYLLABLES = 6
+# Misses are blended with the list-wide rate as if from this many extra students
+MISS_RATE_PRIOR_WEIGHT = 5
+
+_VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+
+
+def syllable_count(word):
+    """Rough syllable estimate from vowel groups, with a silent final e"""
+    groups = len(_VOWEL_GROUPS.findall(word))
+    if word.endswith('e') and not word.endswith(('le', 'ee', 'ye')) and groups > 1:
+        groups -= 1
+    return max(1, groups)
+
+
+def bigram_surprisal(words):
+    """Mean -log2 probability of each word's letter pairs, with pair counts taken from the list itself"""
+    counts = Counter()
+    for word in words:
+        padded = f"^{word}$"
+        counts.update(padded[i:i + 2] for i in range(len(padded) - 1))
+    total = sum(counts.values()) or 1
+    cost = {pair: -math.log2(count / total) for pair, count in counts.items()}
+    surprisal = {}
+    for word in words:
+        padded = f"^{word}$"
+        pairs = [padded[i:i + 2] for i in range(len(padded) - 1)]
+        surprisal[word] = sum(cost[pair] for pair in pairs) / len(pairs)
+    return surprisal
+
+
+def _normalise(values):
+    low, high = min(values.values(), default=0), max(values.values(), default=0)
+    span = (high - low) or 1
+    return {key: (value - low) / span for key, value in values.items()}
+
+
+def score_words(words, miss_stats):
+    """{word: score 0-100}; miss_stats maps word -> (students, misses)"""
+    rarity = _normalise(bigram_surprisal(words))
+    students = sum(n for n, _ in miss_stats.values())
+    prior = sum(m for _, m in miss_stats.values()) / students if students else 0.0
+
+    scores = {}
+    for word in words:
+        n, misses = miss_stats.get(word, (0, 0))
+        features = {
+            'length': min(len(word), MAX_LENGTH) / MAX_LENGTH,
+            'rarity': rarity[word],
+            'syllables': min(syllable_count(word), MAX_SYLLABLES) / MAX_SYLLABLES,
+            'miss_rate': (misses + prior * MISS_RATE_PRIOR_WEIGHT) / (n + MISS_RATE_PRIOR_WEIGHT),
+        }
+        scores[word] = round(100 * sum(WEIGHTS[name] * value for name, value in features.items()), 1)
+    return scores
+
+
+def refresh_scores(repository, word_list):
+    """Score every word in the list and store the scores; returns {word: score}"""
+    miss_stats = {word: (students, misses) for word, students, misses in repository.word_miss_stats()}
+    scores = score_words(word_list.words, miss_stats)
+    repository.save_word_scores(word_list.list_id, [(scores[word], number)
+                                                   for number, word in enumerate(word_list.words, 1)])
+    return scores
+
+
+def target_band(first_try_rate, practiced, width=10.0):
+    """(low, high) scores for a student who gets first_try_rate of words right first time
+
+    New students start in the easier half; the band moves up as accuracy rises.
+    """
+    center = 35.0 if practiced < 5 else 15.0 + 70.0 * first_try_rate
+    return max(0.0, center - width), min(100.0, center + width)
@@ -0,0 +1,89 @@
+"""Drop the game state of browser sessions that have gone idle
+
+Streamlit keeps a session's state for as long as the session object lives,
+and guests who leave a tab open hold their progress, due queue and practice
+round in memory indefinitely. Each script run records its session here; a
+sweep piggybacked on those runs removes the per-user keys from sessions idle
+for longer than the timeout. Everything removed is reloaded from the
+database on the session's next run, and an interrupted practice round is
+resumed from the copy saved after every answer.
+"""
+import os
+import threading
+import time
+
+from metrics import metrics
+
+IDLE_SESSION_TIMEOUT = int(os.environ.get("SPELLING_IDLE_SESSION_TIMEOUT", "1800"))  # Seconds
+SWEEP_INTERVAL = 60  # Seconds between sweeps
+
+
+class IdleSessionEvictor:
+    """Last-run times of live sessions, and the sweep that trims idle ones"""
+
+    def __init__(self, keys, timeout=IDLE_SESSION_TIMEOUT, sweep_interval=SWEEP_INTERVAL):
+        self.keys = tuple(keys)
+        self.timeout = timeout
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self._sessions = {}  # session id -> (last run, session state)
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def touch(self, session_id, state, now=None):
+        """Record a run of the session; sweeps idle sessions when one is due"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._sessions[session_id] = (now, state)
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        self.sweep(now)
+
+    def sweep(self, now=None):
+        """Evict every session idle past the timeout; returns how many were evicted"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [(session_id, state) for session_id, (last_run, state) in self._sessions.items()
+                    if now - last_run > self.timeout]
+            for session_id, _ in idle:
+                del self._sessions[session_id]
+        evicted = sum(1 for _, state in idle if self.evict(state))
+        with self._lock:
+            self.evicted += evicted
+        return evicted
+
+    def evict(self, state):
+        """Remove the per-user keys from one session's state; returns False if it was left alone"""
+        # Streamlit's session state has no .get(), only membership and item access
+        # Answers not yet written would be lost, so the session keeps them
+        if 'dirty_words' in state and state['dirty_words']:
+            return False
+        if 'practice_mode' in state and state['practice_mode']:
+            state['resume_pending'] = True
+        for key in self.keys:
+            if key in state:
+                del state[key]
+        return True
+
+
+_evictor = None
+_evictor_lock = threading.Lock()
+
+
+def get_idle_evictor(keys=()):
+    """Process-wide evictor; keys are the session state keys it drops, fixed when it is created"""
+    global _evictor
+    if _evictor is None:
+        with _evictor_lock:
+            if _evictor is None:
+                _evictor = IdleSessionEvictor(keys)
+    return _evictor
+
+
+metrics.register_gauge('spelling_active_sessions', lambda: len(_evictor) if _evictor else 0)
+metrics.register_gauge('spelling_evicted_sessions_total', lambda: _evictor.evicted if _evictor else 0,
+                       kind='counter')
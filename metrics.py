@@ -0,0 +1,186 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Set SPELLING_METRICS_PORT to serve /metrics to a Prometheus scraper. The endpoint has
+# no authentication, so it listens on loopback unless SPELLING_METRICS_HOST says otherwise
+METRICS_PORT = os.environ.get("SPELLING_METRICS_PORT")
+METRICS_HOST = os.environ.get("SPELLING_METRICS_HOST", "127.0.0.1")
+
+# Upper bounds in seconds, Prometheus style
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # Quantiles report at most this, never the +Inf overflow bucket
+        self.max_bound = max((bound for bound in buckets if bound != float('inf')), default=0.0)
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile
+
+        A quantile in the overflow bucket is reported as the largest finite
+        bound, so snapshots stay valid JSON (which has no Infinity).
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_bound)
+        return self.max_bound
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+class Metrics:
+    """Process-wide timing histograms, counters and gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> number
+        self._gauges = {}  # name -> (kind, callable)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_gauge(self, name, read, kind='gauge'):
+        """Report read() at export time; kind is 'gauge' or 'counter'"""
+        with self._lock:
+            self._gauges[name] = (kind, read)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator recording each call's duration"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _read_gauges(self):
+        values = {}
+        for name, (kind, read) in self._gauges.items():
+            try:
+                values[name] = (kind, float(read()))
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self):
+        """JSON-serializable view of every metric"""
+        with self._lock:
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': h.count,
+                    'sum': h.sum,
+                    'mean': h.sum / h.count if h.count else 0.0,
+                    'p50': h.quantile(0.5),
+                    'p95': h.quantile(0.95),
+                    'p99': h.quantile(0.99),
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = self._read_gauges()
+        return {
+            'histograms': histograms,
+            'counters': counters,
+            'gauges': {name: value for name, (_, value) in sorted(gauges.items())},
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {name} histogram')
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    bucket_labels = labels + (('le', _format_bound(bound)),)
+                    lines.append(f'{name}_bucket{_label_text(bucket_labels)} {cumulative}')
+                lines.append(f'{name}_sum{_label_text(labels)} {h.sum}')
+                lines.append(f'{name}_count{_label_text(labels)} {h.count}')
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {name} counter')
+                    typed.add(name)
+                lines.append(f'{name}{_label_text(labels)} {value}')
+            for name, (kind, value) in sorted(self._read_gauges().items()):
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics():
+    """Start the /metrics endpoint once per process when SPELLING_METRICS_PORT is set"""
+    global _server
+    if not METRICS_PORT or _server is not None:
+        return
+    with _server_lock:
+        if _server is None:
+            # http.server is only imported by processes that export metrics
+            from metrics_server import start_metrics_server
+            try:
+                _server = start_metrics_server(metrics, METRICS_PORT, METRICS_HOST)
+            except OSError:
+                # Another app process on this host has the port
+                _server = False
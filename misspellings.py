@@ -0,0 +1,248 @@
+"""Misspelling analysis: edit distances, alignments and common error patterns
+
+Misses are read from the attempt log in batches and reduced to per-student
+pattern counts and per-word misspelling counts, so dashboards only read the
+results.
+"""
+from collections import Counter
+
+# Answers further than this from the word are not aligned, just counted as far off
+MAX_ANALYZED_DISTANCE = 4
+ANALYSIS_BATCH_SIZE = 5000
+VOWELS = frozenset('aeiouy')
+
+PATTERN_LABELS = {
+    'ie_ei': "ie / ei swapped",
+    'missed_double': "single letter for a double",
+    'extra_double': "doubled a single letter",
+    'silent_e': "dropped silent e",
+    'vowel': "wrong vowel",
+    'transposition': "swapped letters",
+    'real_word': "typed a different word",
+    'omission': "missing letter",
+    'insertion': "extra letter",
+    'substitution': "wrong letter",
+    'far_off': "far from the word",
+}
+
+
+def banded_distance(a, b, band):
+    """Levenshtein distance when it is at most band, else band + 1
+
+    Only cells within band of the diagonal are computed, and rows stop as
+    soon as every cell exceeds the band, so far-off pairs are cheap.
+    """
+    over = band + 1
+    if abs(len(a) - len(b)) > band:
+        return over
+    previous = [j if j <= band else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= band:
+            current[0] = i
+        lo, hi = max(1, i - band), min(len(b), i + band)
+        for j in range(lo, hi + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost, over)
+        if min(current[lo - 1:hi + 1]) > band:
+            return over
+        previous = current
+    return previous[len(b)]
+
+
+def levenshtein(a, b):
+    return banded_distance(a, b, max(len(a), len(b)))
+
+
+def _drops_double(expected, i):
+    """Whether deleting expected[i] turns a doubled consonant into a single one"""
+    letter = expected[i]
+    return letter not in VOWELS and ((i > 0 and expected[i - 1] == letter)
+                                     or (i + 1 < len(expected) and expected[i + 1] == letter))
+
+
+def _adds_double(expected, i, letter):
+    """Whether inserting letter before expected[i] doubles a consonant"""
+    return letter not in VOWELS and ((i > 0 and expected[i - 1] == letter)
+                                     or (i < len(expected) and expected[i] == letter))
+
+
+def align(expected, typed):
+    """Edits turning expected into typed, as (op, position in expected, expected text, typed text)
+
+    op is 'sub', 'del', 'ins' or 'swap' (adjacent transposition); matches are left out.
+    """
+    n, m = len(expected), len(typed)
+    d = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n + 1):
+        d[i][0] = i
+    for j in range(m + 1):
+        d[0][j] = j
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost = 0 if expected[i - 1] == typed[j - 1] else 1
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and expected[i - 1] == typed[j - 2] and expected[i - 2] == typed[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+
+    ops = []
+    i, j = n, m
+    while i or j:
+        if i and j and expected[i - 1] == typed[j - 1] and d[i][j] == d[i - 1][j - 1]:
+            i, j = i - 1, j - 1
+        # Where edits tie, a dropped or added double letter (tommorow) beats substitutions
+        elif i and d[i][j] == d[i - 1][j] + 1 and _drops_double(expected, i - 1):
+            ops.append(('del', i - 1, expected[i - 1], ''))
+            i -= 1
+        elif j and d[i][j] == d[i][j - 1] + 1 and _adds_double(expected, i, typed[j - 1]):
+            ops.append(('ins', i, '', typed[j - 1]))
+            j -= 1
+        elif i and j and d[i][j] == d[i - 1][j - 1] + 1:
+            ops.append(('sub', i - 1, expected[i - 1], typed[j - 1]))
+            i, j = i - 1, j - 1
+        elif (i > 1 and j > 1 and expected[i - 1] == typed[j - 2] and expected[i - 2] == typed[j - 1]
+              and d[i][j] == d[i - 2][j - 2] + 1):
+            ops.append(('swap', i - 2, expected[i - 2:i], typed[j - 2:j]))
+            i, j = i - 2, j - 2
+        elif i and d[i][j] == d[i - 1][j] + 1:
+            ops.append(('del', i - 1, expected[i - 1], ''))
+            i -= 1
+        else:
+            ops.append(('ins', i, '', typed[j - 1]))
+            j -= 1
+    ops.reverse()
+    return ops
+
+
+def classify(expected, typed, ops):
+    """Error pattern names for an alignment"""
+    patterns = []
+    for op, i, was, now in ops:
+        if op == 'swap':
+            patterns.append('ie_ei' if set(was) == {'i', 'e'} else 'transposition')
+        elif op == 'del':
+            if _drops_double(expected, i):
+                patterns.append('missed_double')
+            elif was == 'e' and i == len(expected) - 1:
+                patterns.append('silent_e')
+            else:
+                patterns.append('omission')
+        elif op == 'ins':
+            patterns.append('extra_double' if _adds_double(expected, i, now) else 'insertion')
+        elif was in VOWELS and now in VOWELS:
+            patterns.append('vowel')
+        else:
+            patterns.append('substitution')
+    return patterns
+
+
+class BKTree:
+    """Burkhard-Keller tree: words within an edit distance without comparing against the whole list"""
+
+    def __init__(self, words=()):
+        self._root = None  # (word, {distance: child node})
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, word):
+        if self._root is None:
+            self._root = (word, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = levenshtein(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self._size += 1
+                return
+            node = child
+
+    def search(self, word, max_distance):
+        """(distance, word) for every word within max_distance, nearest first"""
+        if self._root is None:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            node_word, children = stack.pop()
+            distance = levenshtein(word, node_word)
+            if distance <= max_distance:
+                results.append((distance, node_word))
+            # Triangle inequality: only children in this distance range can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        results.sort()
+        return results
+
+    def __contains__(self, word):
+        return bool(self.search(word, 0))
+
+
+def analyze(expected, typed, tree=None):
+    """(distance, patterns) for one miss; tree, if given, spots answers that are other list words"""
+    distance = banded_distance(expected, typed, MAX_ANALYZED_DISTANCE)
+    if distance > MAX_ANALYZED_DISTANCE:
+        return distance, ['far_off']
+    # Each pattern counts once per miss, however many letters it touched
+    patterns = list(dict.fromkeys(classify(expected, typed, align(expected, typed))))
+    if tree is not None and typed in tree:
+        patterns.append('real_word')
+    return distance, patterns
+
+
+def analyze_batch(misses, tree=None):
+    """Reduce (user_id, word, typed) misses to per-user pattern counts and per-misspelling results
+
+    Returns (Counter of (user_id, pattern), {(word, typed): [count, distance, patterns]}).
+    Each distinct misspelling is analysed once however many students made it.
+    """
+    results = {}
+    user_patterns = Counter()
+    for user_id, word, typed in misses:
+        key = (word, typed)
+        entry = results.get(key)
+        if entry is None:
+            distance, patterns = analyze(word, typed, tree)
+            entry = results[key] = [0, distance, patterns]
+        entry[0] += 1
+        for pattern in entry[2]:
+            user_patterns[(user_id, pattern)] += 1
+    return user_patterns, results
+
+
+_trees = {}  # (list_id, digest) -> BKTree
+
+
+def tree_for(word_list):
+    """BK-tree over a word list, built once per list version"""
+    key = (word_list.list_id, word_list.digest)
+    tree = _trees.get(key)
+    if tree is None:
+        tree = _trees[key] = BKTree(word_list.words)
+    return tree
+
+
+def refresh_error_patterns(repository, word_list=None, batch_size=ANALYSIS_BATCH_SIZE):
+    """Analyse misses logged since the last run; returns how many were processed"""
+    tree = tree_for(word_list) if word_list is not None else None
+    processed = 0
+    while True:
+        rows = repository.misses_since(repository.get_watermark('misspellings'), batch_size)
+        if not rows:
+            return processed
+        user_patterns, results = analyze_batch([row[1:] for row in rows], tree)
+        repository.save_miss_analysis(
+            [(user_id, pattern, count) for (user_id, pattern), count in user_patterns.items()],
+            [(word, typed, count, distance, ','.join(patterns))
+             for (word, typed), (count, distance, patterns) in results.items()],
+            'misspellings', rows[-1][0])
+        processed += len(rows)
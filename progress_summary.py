@@ -0,0 +1,99 @@
+import sys
+from bisect import bisect_left, insort
+
+
+class ProgressSummary:
+    """Per-user word results bucketed by attempt count, updated in O(1) per answer"""
+
+    def __init__(self):
+        self.buckets = {}  # attempts -> {word: None}, insertion ordered
+        self.attempts = {}  # word -> attempts
+        self._sorted = {}  # attempts -> bucket sorted by _sort_key, built by page() and kept by record()
+        self._sort_key = None
+
+    @classmethod
+    def from_stats(cls, word_stats):
+        summary = cls()
+        for word, attempts in word_stats.items():
+            summary.record(word, attempts)
+        return summary
+
+    def record(self, word, attempts):
+        old = self.attempts.get(word)
+        if old == attempts:
+            return
+        if old is None:
+            # One copy of each word string however many sessions have practised it
+            word = sys.intern(word)
+        else:
+            bucket = self.buckets[old]
+            del bucket[word]
+            if not bucket:
+                del self.buckets[old]
+                self._sorted.pop(old, None)
+            elif old in self._sorted:
+                self._remove_sorted(self._sorted[old], word)
+        self.attempts[word] = attempts
+        self.buckets.setdefault(attempts, {})[word] = None
+        if attempts in self._sorted:
+            insort(self._sorted[attempts], word, key=self._sort_key)
+
+    def _remove_sorted(self, words, word):
+        # Several words can share a key, so step over them to the word itself
+        i = bisect_left(words, self._sort_key(word), key=self._sort_key)
+        while words[i] is not word and words[i] != word:
+            i += 1
+        del words[i]
+
+    def count(self, attempts):
+        return len(self.buckets.get(attempts, ()))
+
+    def __len__(self):
+        return len(self.attempts)
+
+    @property
+    def perfect(self):
+        return self.count(1)
+
+    @property
+    def learned(self):
+        return self.count(2)
+
+    @property
+    def needs_practice(self):
+        return len(self.attempts) - self.perfect - self.learned
+
+    @property
+    def completed(self):
+        return self.perfect + self.learned
+
+    def by_attempts(self, descending=True):
+        """Yield (attempts, words) buckets in attempt order"""
+        for attempts in sorted(self.buckets, reverse=descending):
+            yield attempts, self.buckets[attempts]
+
+    def page(self, offset, limit, descending=True, key=None):
+        """(attempts, word) pairs for one page in attempt order
+
+        With a key, buckets are sorted by it once and kept sorted as words are
+        recorded, so a page is a slice rather than a sort of every practiced word.
+        """
+        if key is not None and key != self._sort_key:
+            self._sorted = {}
+            self._sort_key = key
+        rows = []
+        for attempts, bucket in self.by_attempts(descending):
+            if offset >= len(bucket):
+                offset -= len(bucket)
+                continue
+            if key is None:
+                words = list(bucket)
+            else:
+                words = self._sorted.get(attempts)
+                if words is None:
+                    words = self._sorted[attempts] = sorted(bucket, key=key)
+            rows += [(attempts, word) for word in words[offset:offset + limit - len(rows)]]
+            offset = 0
+            if len(rows) >= limit:
+                break
+        return rows
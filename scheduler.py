@@ -0,0 +1,82 @@
+import heapq
+from collections import namedtuple
+
+DAY = 24 * 60 * 60
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Interval is in days, due is a unix timestamp
+ReviewState = namedtuple('ReviewState', ['ease', 'interval', 'repetitions', 'due'])
+
+
+# How a word was answered: right first time, right on the second try, or missed twice
+FIRST_TRY = 'first_try'
+RETRY = 'retry'
+FAILED = 'failed'
+QUALITY = {FIRST_TRY: 5, RETRY: 3, FAILED: 1}
+
+
+def quality_for(outcome):
+    """Map an answer outcome onto the SM-2 0-5 quality scale; failures score below 3 and are relearned"""
+    return QUALITY[outcome]
+
+
+def review(state, quality, now):
+    """SM-2 update of a word's review state after an answer of the given quality"""
+    if state is None:
+        state = ReviewState(DEFAULT_EASE, 0, 0, now)
+
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions = state.repetitions + 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = round(state.interval * ease)
+    return ReviewState(ease, interval, repetitions, now + interval * DAY)
+
+
+class DueQueue:
+    """Min-heap of words by due time; updates push a new entry and stale ones are skipped on pop"""
+
+    def __init__(self, states=None):
+        self.states = dict(states or {})  # word -> ReviewState
+        self._heap = [(state.due, word) for word, state in self.states.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self.states)
+
+    def update(self, word, state):
+        self.states[word] = state
+        heapq.heappush(self._heap, (state.due, word))
+
+    def requeue(self, words):
+        """Put popped words back with their current state"""
+        for word in words:
+            state = self.states.get(word)
+            if state is not None:
+                heapq.heappush(self._heap, (state.due, word))
+
+    def _is_current(self, due, word):
+        state = self.states.get(word)
+        return state is not None and state.due == due
+
+    def pop_due(self, now, limit=None):
+        """Pop words due at or before now, earliest first"""
+        words = []
+        seen = set()
+        while self._heap and (limit is None or len(words) < limit):
+            due, word = self._heap[0]
+            if due > now:
+                break
+            heapq.heappop(self._heap)
+            if word not in seen and self._is_current(due, word):
+                seen.add(word)
+                words.append(word)
+        return words
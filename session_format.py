@@ -0,0 +1,42 @@
+import struct
+import sys
+from array import array
+
+SESSION_FORMAT_VERSION = 1
+
+# version, list_id, cursor, attempts, list digest prefix, word count; little-endian
+_HEADER = struct.Struct('<BIIB8sI')
+
+
+def _digest_prefix(digest):
+    return bytes.fromhex(digest[:16]) if digest else bytes(8)
+
+
+def encode_session(list_id, digest, word_numbers, cursor, attempts):
+    """Pack a practice session as a fixed header followed by the word numbers as uint32s"""
+    numbers = array('I', word_numbers)
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    header = _HEADER.pack(SESSION_FORMAT_VERSION, list_id, cursor, attempts, _digest_prefix(digest), len(numbers))
+    return header + numbers.tobytes()
+
+
+def decode_session(blob, digest=None):
+    """Unpack a session; returns None for an unknown version or a list that changed since it was saved"""
+    if not blob or len(blob) < _HEADER.size:
+        return None
+    version, list_id, cursor, attempts, digest_prefix, count = _HEADER.unpack_from(blob)
+    if version != SESSION_FORMAT_VERSION:
+        return None
+    if digest is not None and digest_prefix != _digest_prefix(digest):
+        return None
+    numbers = array('I')
+    numbers.frombytes(blob[_HEADER.size:_HEADER.size + count * numbers.itemsize])
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return {
+        'list_id': list_id,
+        'numbers': numbers,
+        'cursor': cursor,
+        'attempts': attempts,
+    }
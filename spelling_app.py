@@ -1,50 +1,193 @@
 import streamlit as st
-import csv
 import os
+import sys
 import random
+import secrets
 import json
-from gtts import gTTS
-import tempfile
-from datetime import datetime
-import base64
 import time
-import pandas as pd
-import sqlite3
-import hashlib
-import hmac
+from array import array
+from datetime import datetime
+from importlib.util import find_spec
+from auth import get_authenticator
+from audio_cache import AudioCache, get_audio_cache, get_audio_url, get_prefetcher
+from tts import get_backend
+from db import get_attempt_log, get_progress_writer, get_repository
+from word_lists import DEFAULT_LIST, get_word_list_store
+from progress_summary import ProgressSummary
+from scheduler import FAILED, FIRST_TRY, RETRY, DueQueue, ReviewState, quality_for, review
+from metrics import metrics, serve_metrics
+from misspellings import PATTERN_LABELS
+from difficulty import refresh_scores, target_band
+from session_format import decode_session, encode_session
+from state_store import get_state_store
+from idle_sessions import get_idle_evictor
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Number of upcoming practice words to render audio for in the background
+PREFETCH_AHEAD = 5
+# Users per page and cache lifetime (seconds) for the admin dashboard
+ADMIN_PAGE_SIZE = 50
+ADMIN_STATS_TTL = 30
+# Per-user game state, reloaded whenever someone logs in
+USER_STATE_KEYS = ('word_stats', 'dirty_words', 'progress_summary', 'due_queue', 'current_word',
+                   'current_words', 'attempts', 'word_count', 'practice_mode', 'show_statistics',
+                   'current_audio', 'resume_attempts')
+# Lifetime of the login token kept in the page URL, in seconds. The URL is a
+# bearer credential: it stays in browser history and in copied links, which on a
+# shared classroom computer hands the login to the next pupil. Tokens therefore
+# expire soon, are replaced every LOGIN_ROTATE seconds while the page is in use
+# and whenever one is used to restore a login, and are deleted on logout
+LOGIN_TTL = 30 * 60
+LOGIN_ROTATE = 10 * 60
+# Words per "practice at my level" round
+LEVEL_PRACTICE_SIZE = 20
+# Days of history in the class trend
+TREND_DAYS = 7
+# Rows per page in the word list and statistics views
+PAGE_SIZES = (25, 50, 100, 250)
+# "dataframe" renders tables with st.dataframe, which loads pandas on first use;
+# "markdown" renders them as plain markdown and never imports pandas
+TABLE_RENDERER = os.environ.get("SPELLING_TABLE_RENDERER", "dataframe")
+
+def timed_method(func):
+    """Record the method's duration in the spelling_method_seconds histogram"""
+    return metrics.timed('spelling_method_seconds', method=func.__name__)(func)
+
+def markdown_table(rows, columns):
+    """Rows (dicts) as a markdown table"""
+    def cell(value):
+        return str(value).replace('|', '\\|')
+    lines = ['| ' + ' | '.join(columns) + ' |', '|' + ' --- |' * len(columns)]
+    lines += ['| ' + ' | '.join(cell(row[column]) for column in columns) + ' |' for row in rows]
+    return '\n'.join(lines)
+
+def show_table(rows, view, column_config=None):
+    """Render a list of dicts as a table, timed as spelling_table_seconds{view=...}"""
+    with metrics.timer('spelling_table_seconds', view=view):
+        if TABLE_RENDERER == 'markdown' or find_spec('pandas') is None:
+            if rows:
+                st.markdown(markdown_table(rows, list(rows[0])))
+        else:
+            st.dataframe(rows, column_config=column_config, hide_index=True)
+
+def fetch_page(fetch, page_size, key):
+    """(rows, total) from fetch(page) for the page remembered under key
+
+    A narrower search can leave that page past the end; it is moved back to
+    the last page before anything is rendered.
+    """
+    page = st.session_state.get(key, 1)
+    rows, total = fetch(page)
+    last = max(1, -(-total // page_size))
+    if page > last:
+        st.session_state[key] = last
+        rows, total = fetch(last)
+    return rows, total
+
+def page_selector(total, page_size, key):
+    """Page number widget for total rows, after fetch_page; returns the current page (1-based)"""
+    pages = max(1, -(-total // page_size))
+    if pages > 1:
+        return st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=key)
+    return 1
+
+def paging_controls(key):
+    """Prefix search box and page size picker; returns (prefix, page size)"""
+    def first_page():
+        st.session_state[f"{key}_page"] = 1
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        prefix = st.text_input("Search words starting with", key=f"{key}_search", on_change=first_page)
+    with col2:
+        page_size = st.selectbox("Per page", PAGE_SIZES, key=f"{key}_page_size", on_change=first_page)
+    return prefix.strip(), page_size
 
 class SpellingBee:
     def __init__(self):
+        try:
+            self.tts = get_backend()
+        except Exception as e:
+            # e.g. a misspelled SPELLING_TTS_BACKEND; practice carries on without audio
+            st.error(f"Text-to-speech unavailable: {str(e)}")
+            self.tts = None
         self.setup_db()
-        self.load_words()
-        # Check authentication
+        # Check authentication; a login can change which list is loaded
         self.check_authentication()
+        self.load_words()
         
         # Initialize session state if not exists
-        if 'word_stats' not in st.session_state:
-            st.session_state.word_stats = self.load_progress()
+        if 'progress_summary' not in st.session_state:
+            st.session_state.progress_summary = ProgressSummary.from_stats(self.load_progress())
+        # The summary's word -> attempts dict, not a second copy of it
+        st.session_state.word_stats = st.session_state.progress_summary.attempts
+        if 'dirty_words' not in st.session_state:
+            st.session_state.dirty_words = set()
+        if 'due_queue' not in st.session_state:
+            st.session_state.due_queue = self.load_schedule()
         if 'current_word' not in st.session_state:
             st.session_state.current_word = None
         if 'current_words' not in st.session_state:
-            st.session_state.current_words = []
+            st.session_state.current_words = array('I')
         if 'attempts' not in st.session_state:
             st.session_state.attempts = 0
         if 'word_count' not in st.session_state:
             st.session_state.word_count = 0
+        
+        # After reconnecting to another app process, carry on where the last one stopped
+        if st.session_state.pop('resume_pending', False):
+            saved = self.load_session()
+            if saved and saved['count'] < len(saved['numbers']):
+                self.resume_practice(saved)
             
     def check_authentication(self):
         if 'username' not in st.session_state:
-            self.show_login()
+            # Any app process can pick the login back up from the token in the URL
+            token = st.query_params.get('session')
+            username = self.login_from_token(token) if token else None
+            if username:
+                self.start_session(username)
+                st.session_state.resume_pending = True
+            else:
+                self.show_login()
+        elif time.time() - st.session_state.get('login_token_at', 0) > LOGIN_ROTATE:
+            self.issue_login_token(st.session_state.username)
+    
+    def issue_login_token(self, username):
+        """Put a fresh login token in the URL and revoke the one it replaces"""
+        try:
+            store = get_state_store()
+            old_token = st.query_params.get('session')
+            token = secrets.token_urlsafe(24)
+            store.set(f"login:{token}", username, LOGIN_TTL)
+            st.query_params['session'] = token
+            st.session_state.login_token_at = time.time()
+            if old_token:
+                store.delete(f"login:{old_token}")
+        except Exception as e:
+            st.error(f"Could not save login: {str(e)}")
+    
+    def login_from_token(self, token):
+        try:
+            username = get_state_store().get(f"login:{token}")
+            return username.decode() if isinstance(username, bytes) else username
+        except Exception as e:
+            st.error(f"Could not restore login: {str(e)}")
+            return None
         
     def show_login(self):
         st.markdown("### 🐝 Spelling Bee Login")  # Smaller login header
         
+        notice = st.session_state.pop('login_notice', None)
+        if notice:
+            st.success(notice)
+        
         # Add guest login button with warning
         st.warning("⚠️ Guest progress will be lost when you close the browser", icon="⚠️")
         if st.button("👤 Continue as Guest", use_container_width=True):
-            # Create a unique guest username
-            guest_id = f"guest_{int(time.time())}"
-            st.session_state.username = guest_id
+            # Random rather than time-based, so guests arriving together never share an ID
+            guest_id = f"guest_{secrets.token_hex(8)}"
+            self.start_session(guest_id)
             st.rerun()
         
         st.write("---")  # Add divider between guest and regular login
@@ -58,7 +201,7 @@ class SpellingBee:
             
             if st.button("Login", key="login_button"):
                 if self.verify_credentials(username, password):
-                    st.session_state.username = username
+                    self.start_session(username)
                     st.rerun()
                 else:
                     st.error("Invalid username or password")
@@ -70,10 +213,43 @@ class SpellingBee:
             
             if st.button("Register", key="register_button"):
                 if self.register_user(new_username, new_password, confirm_password):
-                    st.success("Registration successful! Please login.")
-                    time.sleep(2)
+                    # Shown on the next run instead of holding this one open
+                    st.session_state.login_notice = "Registration successful! Please login."
                     st.rerun()
     
+    def start_session(self, username):
+        """Log the user in; role and classes are read once here instead of on every rerun"""
+        # Drop anything loaded before login so the user's own progress is read
+        for key in USER_STATE_KEYS:
+            st.session_state.pop(key, None)
+        st.session_state.username = username
+        self.issue_login_token(username)
+        try:
+            st.session_state.role = self.db.get_user_role(username)
+            st.session_state.classes = [tuple(row) for row in self.db.user_classes(username)]
+        except Exception as e:
+            st.error(f"Could not load classes: {str(e)}")
+            st.session_state.role = None
+            st.session_state.classes = []
+        
+        # Practice the list of the first class that has one
+        class_lists = [word_list for _, _, _, word_list, _ in st.session_state.classes if word_list]
+        if class_lists:
+            st.session_state.word_list = class_lists[0]
+    
+    def end_session(self):
+        """Log out: forget the login token and every piece of per-user state"""
+        token = st.query_params.get('session')
+        if token:
+            try:
+                get_state_store().delete(f"login:{token}")
+            except Exception as e:
+                st.error(f"Could not end login: {str(e)}")
+            del st.query_params['session']
+        for key in ('username', 'role', 'classes', 'word_list', 'login_token_at') + USER_STATE_KEYS:
+            st.session_state.pop(key, None)
+    
+    @timed_method
     def register_user(self, username, password, confirm_password):
         try:
             # Basic validation
@@ -86,310 +262,515 @@ class SpellingBee:
                 return False
             
             # Check if username exists
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "users.db")
-            
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
-            
-            # Create users table if it doesn't exist
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS users
-                (username TEXT PRIMARY KEY,
-                 password_hash TEXT,
-                 created_at TEXT)
-            ''')
-            
-            # Check if username exists
-            c.execute('SELECT username FROM users WHERE username = ?', (username,))
-            if c.fetchone():
+            if self.db.user_exists(username):
                 st.error("Username already exists")
-                conn.close()
                 return False
             
-            # Hash the password
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
-            # Insert new user
-            c.execute('''
-                INSERT INTO users (username, password_hash, created_at)
-                VALUES (?, ?, ?)
-            ''', (username, password_hash, datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
+            # Insert new user with a salted scrypt hash
+            get_authenticator().register(username, password)
             return True
             
         except Exception as e:
             st.error(f"Registration failed: {str(e)}")
             return False
     
+    @timed_method
     def verify_credentials(self, username, password):
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "users.db")
-            
-            if not os.path.exists(db_path):
-                st.error("No users database found")
-                return False
-            
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
-            
-            # Get user's password hash
-            c.execute('SELECT password_hash FROM users WHERE username = ?', (username,))
-            result = c.fetchone()
-            
-            if not result:
+            if not username or not password:
                 return False
             
-            stored_hash = result[0]
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
-            conn.close()
-            return stored_hash == password_hash
+            # Constant-time check on the hashing pool; legacy hashes are upgraded on success
+            return get_authenticator().verify(username, password)
             
         except Exception as e:
             st.error(f"Login failed: {str(e)}")
             return False
     
+    @timed_method
     def setup_db(self):
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "spelling_progress.db")
-            
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
-            
-            # Create progress table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS progress
-                (user_id TEXT,
-                 word TEXT,
-                 attempts INTEGER,
-                 last_practiced TEXT,
-                 PRIMARY KEY (user_id, word))
-            ''')
-            
-            # Create sessions table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS sessions
-                (user_id TEXT PRIMARY KEY,
-                 current_words TEXT,
-                 word_count INTEGER,
-                 last_updated TEXT)
-            ''')
-            
-            conn.commit()
-            conn.close()
+            # Shared repository; creates the tables on first use
+            self.db = get_repository()
         except Exception as e:
             st.error(f"Could not setup database: {str(e)}")
 
+    @timed_method
     def load_words(self):
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            csv_path = os.path.join(script_dir, 'spelling_words.csv')
-            
-            with open(csv_path, 'r') as file:
-                reader = csv.reader(file)
-                # Create a list of tuples with (index, word)
-                self.words = [(i+1, row[0].strip().lower()) for i, row in enumerate(reader)]
+            # Loaded once per process and shared; re-imported only when the file changes
+            self.word_list = get_word_list_store().get(st.session_state.get('word_list', DEFAULT_LIST))
+            # Tuples of (index, word)
+            self.words = self.word_list.entries
         except Exception as e:
             st.error(f"Could not load words: {str(e)}")
+            self.word_list = None
             self.words = [(1, "example"), (2, "test"), (3, "words")]  # Default words if file not found
             
+    @timed_method
+    def words_in_range(self, start_num, end_num):
+        """(number, word) tuples for the numbered range, inclusive"""
+        try:
+            if self.word_list is not None:
+                # Indexed lookup on (list_id, position)
+                return [tuple(row) for row in self.db.list_words_range(self.word_list.list_id, start_num, end_num)]
+        except Exception as e:
+            st.error(f"Could not load word range: {str(e)}")
+        return [w for w in self.words if start_num <= w[0] <= end_num]
+            
+    @timed_method
+    def word_list_page(self, prefix, page, page_size):
+        """(entries, total) for one page of the word list, searched by prefix through the sorted index"""
+        offset = (page - 1) * page_size
+        if self.word_list is not None:
+            return self.word_list.search(prefix, offset, page_size)
+        matches = [w for w in self.words if w[1].startswith(prefix.lower())]
+        return matches[offset:offset + page_size], len(matches)
+
+    @timed_method
+    def stats_page(self, prefix, page, page_size, most_attempts_first=True):
+        """(rows, total) of (number, word, attempts) for one page of the practiced words"""
+        summary = st.session_state.progress_summary
+        number_of = self.word_list.number_of if self.word_list else (lambda word: None)
+        offset = (page - 1) * page_size
+        if prefix:
+            # Only the words matching the prefix are looked up and sorted
+            matches, _ = self.word_list_page(prefix, 1, len(self.words))
+            practiced = [(summary.attempts[word], num, word) for num, word in matches if word in summary.attempts]
+            practiced.sort(key=lambda row: (-row[0] if most_attempts_first else row[0], row[1]))
+            return [(num, word, attempts) for attempts, num, word in practiced[offset:offset + page_size]], len(practiced)
+        # A stable key, so the summary keeps its sorted buckets between reruns
+        key = self.word_list.number_key if self.word_list else None
+        rows = summary.page(offset, page_size, most_attempts_first, key=key)
+        return [(number_of(word), word, attempts) for attempts, word in rows], len(summary)
+
+    @timed_method
     def load_progress(self):
         try:
             if 'username' not in st.session_state:
                 return {}
-                
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "spelling_progress.db")
             
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
+            # Make queued writes visible before reading
+            writer = get_progress_writer()
+            if writer:
+                writer.flush()
             
             # Get progress for specific user
-            c.execute('SELECT word, attempts FROM progress WHERE user_id = ?', 
-                     (st.session_state.username,))
-            results = c.fetchall()
-            
-            conn.close()
-            
-            return {word: attempts for word, attempts in results}
+            return self.db.load_progress(st.session_state.username)
             
         except Exception as e:
             st.error(f"Could not load progress: {str(e)}")
             return {}
             
+    @timed_method
+    def load_schedule(self):
+        try:
+            if 'username' not in st.session_state:
+                return DueQueue()
+            
+            # Make queued writes visible before reading
+            writer = get_progress_writer()
+            if writer:
+                writer.flush()
+            
+            schedule = self.db.load_schedule(st.session_state.username)
+            return DueQueue({word: ReviewState(*state) for word, state in schedule.items()})
+            
+        except Exception as e:
+            st.error(f"Could not load review schedule: {str(e)}")
+            return DueQueue()
+            
+    @timed_method
     def save_progress(self):
         try:
             if 'username' not in st.session_state:
                 return
-                
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "spelling_progress.db")
-            
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
-            
-            # Update progress for specific user
-            for word, attempts in st.session_state.word_stats.items():
-                c.execute('''
-                    INSERT OR REPLACE INTO progress 
-                    (user_id, word, attempts, last_practiced)
-                    VALUES (?, ?, ?, ?)
-                ''', (st.session_state.username, word, attempts, 
-                     datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
+            
+            # Only write the words that changed since the last save
+            dirty = st.session_state.dirty_words
+            if not dirty:
+                return
+            updates = {word: st.session_state.word_stats[word]
+                       for word in dirty if word in st.session_state.word_stats}
+            
+            states = st.session_state.due_queue.states
+            schedule = {word: states[word] for word in dirty if word in states}
+            
+            writer = get_progress_writer()
+            if writer:
+                # Schedule rows ride in the same batch, so an answer costs no commit of its own
+                writer.enqueue(st.session_state.username, updates, schedule)
+            else:
+                self.db.save_progress(st.session_state.username, updates)
+                self.db.save_schedule_rows([(st.session_state.username, word) + tuple(state)
+                                            for word, state in schedule.items()])
+            dirty.clear()
         except Exception as e:
             st.error(f"Could not save progress: {str(e)}")
             
-    def speak_word(self, word):
-        """Generate speech for the word"""
+    def record_attempt(self, word, attempts, outcome):
+        """Store the result for a word and mark it for the next save
+
+        outcome is FIRST_TRY, RETRY or FAILED; a word missed twice is stored
+        with 2 attempts but is scheduled as a failure.
+        """
+        st.session_state.progress_summary.record(word, attempts)
+        queue = st.session_state.due_queue
+        queue.update(word, review(queue.states.get(word), quality_for(outcome), time.time()))
+        st.session_state.dirty_words.add(word)
+        self.save_progress()
+            
+    def log_attempt(self, word, typed, correct):
+        """Append one answer to the attempt log; the insert happens in the background"""
+        now = time.time()
+        shown_at = st.session_state.get('word_shown_at')
+        latency_ms = int((now - shown_at) * 1000) if shown_at else None
+        # The next try at this word is timed from this answer
+        st.session_state.word_shown_at = now
         try:
-            tts = gTTS(text=word, lang='en', slow=False)
-            audio_bytes = tempfile.NamedTemporaryFile(suffix='.mp3')
-            tts.save(audio_bytes.name)
-            
-            # Read audio file into bytes and convert to base64
-            with open(audio_bytes.name, 'rb') as f:
-                audio_bytes_data = f.read()
+            get_attempt_log().enqueue(st.session_state.username, word, typed, correct, latency_ms, now)
+        except Exception as e:
+            st.error(f"Could not log answer: {str(e)}")
             
-            # Clean up temp file
-            audio_bytes.close()
+    @timed_method
+    def level_words(self, count=LEVEL_PRACTICE_SIZE):
+        """Words not yet mastered from the student's difficulty band, easiest first
+
+        The band follows the first-try rate; it is widened when it runs short.
+        """
+        if self.word_list is None:
+            return []
+        summary = st.session_state.progress_summary
+        first_try_rate = summary.perfect / len(summary) if len(summary) else 0.0
+        low, high = target_band(first_try_rate, len(summary))
+        try:
+            if not self.db.has_scores(self.word_list.list_id):
+                # First use of this list version; later rounds are index seeks
+                refresh_scores(self.db, self.word_list)
+            
+            found = {}  # position -> (word, score), kept as the band widens
+            # Start at a random score so rounds differ, take the band upwards, then wrap to its bottom
+            start = random.uniform(low, high)
+            spans = [(start, high), (low, start)]
+            while True:
+                for span_low, span_high in spans:
+                    self.collect_band_words(found, span_low, span_high, count, summary)
+                if len(found) >= count or (low <= 0 and high >= 100):
+                    break
+                wider_low, wider_high = max(0.0, low - 10), min(100.0, high + 10)
+                # Only the newly added edges are read
+                spans = [(high, wider_high), (wider_low, low)]
+                low, high = wider_low, wider_high
+            
+            return [(num, word) for num, (word, _) in sorted(found.items(), key=lambda item: item[1][1])]
+        except Exception as e:
+            st.error(f"Could not pick words: {str(e)}")
+            return []
+            
+    def collect_band_words(self, found, low, high, count, summary):
+        """Page forward through scores low..high until found holds count words not yet mastered"""
+        after = (low, -1)  # Every position sorts after -1, so this starts at the first word scored low
+        while len(found) < count:
+            rows = self.db.words_in_band(self.word_list.list_id, after, high, count * 2)
+            for num, word, score in rows:
+                if summary.attempts.get(word) != 1 and len(found) < count:
+                    found.setdefault(num, (word, score))
+            if len(rows) < count * 2:
+                return
+            after = (rows[-1][2], rows[-1][0])
+    
+    @timed_method
+    def due_words(self, selected_words):
+        """Due words that are in the selection, earliest first
+
+        The words stay queued: answering one pushes its new due time, so a
+        round left early, by any route, leaves the rest due.
+        """
+        queue = st.session_state.due_queue
+        due = queue.pop_due(time.time())
+        queue.requeue(due)
+        numbers = {word: num for num, word in selected_words}
+        return [(numbers[word], word) for word in due if word in numbers]
+            
+    @timed_method
+    def count_due_today(self):
+        try:
+            end_of_day = datetime.combine(datetime.now().date(), datetime.max.time()).timestamp()
+            return self.db.count_due(st.session_state.username, end_of_day)
+        except Exception as e:
+            st.error(f"Could not count due words: {str(e)}")
+            return 0
             
-            return audio_bytes_data
+    @timed_method
+    def speak_word(self, word):
+        """Generate speech for the word if it isn't cached; returns its audio cache key, or None on failure"""
+        if self.tts is None:
+            return None
+        try:
+            if get_prefetcher().fetch(word, self.tts):
+                return AudioCache.make_key(word, 'en', False, self.tts.engine)
+        except Exception as e:
+            st.error(f"Error generating audio: {str(e)}")
+        return None
+
+    def audio_source(self, word, audio_key):
+        """URL of the word's cached audio if the audio server is on, otherwise the raw bytes"""
+        try:
+            url = get_audio_url(audio_key, self.tts.extension)
+        except Exception as e:
+            st.error(f"Could not start audio server: {str(e)}")
+            url = None
+        if url:
+            return url
+        # Sessions keep only the key; the bytes live in the shared, size-bounded cache
+        try:
+            return get_audio_cache().get(audio_key) or get_prefetcher().fetch(word, self.tts)
         except Exception as e:
             st.error(f"Error generating audio: {str(e)}")
             return None
 
+    def word_at(self, number):
+        if self.word_list is not None:
+            return self.word_list.word_at(number)
+        return self.words[number - 1][1]
+
+    def set_practice_words(self, entries):
+        """Start a round from (number, word) tuples, kept as packed word numbers"""
+        st.session_state.current_words = array('I', (num for num, _ in entries))
+        st.session_state.word_count = 0
+
+    def practice_words(self, start=0, stop=None):
+        """(number, word) tuples for part of the current round"""
+        return [(num, self.word_at(num)) for num in st.session_state.current_words[start:stop]]
+
+    def prefetch_words(self, word_tuples):
+        """Queue background audio generation for upcoming practice words"""
+        if self.tts is None:
+            return
+        prefetcher = get_prefetcher()
+        for word_tuple in word_tuples:
+            word = word_tuple[1] if isinstance(word_tuple, tuple) else word_tuple
+            prefetcher.submit(word, self.tts)
+
+    @timed_method
     def save_session(self):
         try:
             if 'username' not in st.session_state or not st.session_state.practice_mode:
                 return
-                
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "spelling_progress.db")
-            
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
-            
-            # Save current session with debug info
-            st.write(f"Saving session: {st.session_state.word_count} words completed")  # Debug info
-            
-            c.execute('''
-                INSERT OR REPLACE INTO sessions
-                (user_id, current_words, word_count, last_updated)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                st.session_state.username,
-                ','.join(st.session_state.current_words),
-                st.session_state.word_count,
-                datetime.now().isoformat()
-            ))
+            if self.word_list is None:
+                return
             
-            conn.commit()
-            conn.close()
+            # Word numbers in the current list, packed with the cursor and attempt state
+            state = encode_session(
+                self.word_list.list_id,
+                self.word_list.digest,
+                st.session_state.current_words,
+                st.session_state.word_count,
+                st.session_state.attempts
+            )
+            self.db.save_session(st.session_state.username, state, st.session_state.word_count)
         except Exception as e:
             st.error(f"Could not save session: {str(e)}")
 
+    def resume_practice(self, saved):
+        """Continue a practice session saved by load_session, whichever process saved it"""
+        st.session_state.current_words = saved['numbers']
+        st.session_state.word_count = saved['count']
+        st.session_state.resume_attempts = saved['attempts']
+        st.session_state.current_word = None
+        self.prefetch_words(self.practice_words(saved['count'], saved['count'] + PREFETCH_AHEAD + 1))
+        st.session_state.practice_mode = True
+
+    def clear_session(self):
+        try:
+            if 'username' in st.session_state:
+                self.db.delete_session(st.session_state.username)
+        except Exception as e:
+            st.error(f"Could not clear session: {str(e)}")
+
+    @timed_method
     def load_session(self):
         try:
-            if 'username' not in st.session_state:
+            if 'username' not in st.session_state or self.word_list is None:
                 return None
-                
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, "spelling_progress.db")
-            
-            conn = sqlite3.connect(db_path)
-            c = conn.cursor()
             
             # Get last session
-            c.execute('''
-                SELECT current_words, word_count, last_updated
-                FROM sessions
-                WHERE user_id = ?
-            ''', (st.session_state.username,))
-            
-            result = c.fetchone()
-            conn.close()
+            result = self.db.load_session(st.session_state.username)
+            if not result:
+                return None
             
-            if result:
-                words, count, timestamp = result
+            state, legacy_words, count, timestamp = result
+            if state is not None:
+                session = decode_session(state, self.word_list.digest)
+                if session is None or session['list_id'] != self.word_list.list_id:
+                    return None  # Saved against a different or since-changed list
+                size = len(self.word_list)
                 return {
-                    'words': words.split(','),
-                    'count': int(count),  # Ensure count is an integer
+                    'numbers': array('I', (n for n in session['numbers'] if 0 < n <= size)),
+                    'count': session['cursor'],
+                    'attempts': session['attempts'],
                     'timestamp': timestamp
                 }
-            return None
+            
+            # Older rows stored a comma-joined word string
+            numbers = (self.word_list.number_of(w) for w in (legacy_words or '').split(','))
+            return {
+                'numbers': array('I', (n for n in numbers if n)),
+                'count': int(count),  # Ensure count is an integer
+                'attempts': 0,
+                'timestamp': timestamp
+            }
             
         except Exception as e:
             st.error(f"Could not load session: {str(e)}")
             return None
 
     def is_admin(self, username):
-        return username == "admin"  # You can modify this to include more admin users
+        # Roles are set with `python -m spelling_app set-role`
+        if username == st.session_state.get('username') and 'role' in st.session_state:
+            return st.session_state.role == 'admin'
+        try:
+            return self.db.get_user_role(username) == 'admin'
+        except Exception:
+            return False
 
-    def get_user_stats(self):
+    @timed_method
+    def get_error_patterns(self):
+        """The student's error patterns from the last bulk analysis, most frequent first"""
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            users_db = os.path.join(script_dir, "users.db")
-            progress_db = os.path.join(script_dir, "spelling_progress.db")
-            
-            users_conn = sqlite3.connect(users_db)
-            progress_conn = sqlite3.connect(progress_db)
-            
-            uc = users_conn.cursor()
-            pc = progress_conn.cursor()
-            
-            # Get registered users
-            uc.execute('SELECT username, created_at FROM users')
-            registered_users = uc.fetchall()
-            
-            # Get all users' progress (including guests)
-            pc.execute('''
-                SELECT user_id, COUNT(DISTINCT word) as words_practiced,
-                       COUNT(CASE WHEN attempts = 1 THEN 1 END) as perfect_words,
-                       MAX(last_practiced) as last_active
-                FROM progress
-                GROUP BY user_id
-            ''')
-            progress_data = pc.fetchall()
-            
-            # Combine the data
-            user_stats = []
-            guest_count = 0
-            
-            for user_id, words, perfect, last_active in progress_data:
-                is_guest = user_id.startswith('guest_')
-                if is_guest:
-                    guest_count += 1
-                
-                user_stats.append({
-                    'Username': user_id,
-                    'Type': 'Guest' if is_guest else 'Registered',
-                    'Words': words,  # Changed from Words Practiced
-                    'Perfect': perfect,  # Changed from Perfect Words
-                    'Last Active': datetime.fromisoformat(last_active).strftime('%Y-%m-%d %H:%M')
-                })
-            
-            users_conn.close()
-            progress_conn.close()
-            
-            return {
-                'user_stats': user_stats,
-                'total_registered': len(registered_users),
-                'total_guests': guest_count
-            }
-            
+            return [{'Mistake': PATTERN_LABELS.get(pattern, pattern), 'Times': misses}
+                    for pattern, misses in self.db.user_error_patterns(st.session_state.username)]
+        except Exception as e:
+            st.error(f"Could not load mistakes: {str(e)}")
+            return []
+
+    def get_common_misspellings(self, word):
+        """The word's most frequent misspellings across all students, from the last bulk analysis"""
+        try:
+            return [{'Typed': typed, 'Times': count,
+                     'Mistakes': ', '.join(PATTERN_LABELS.get(pattern, pattern) for pattern in patterns.split(',') if pattern)}
+                    for typed, count, patterns in self.db.common_misspellings(word)]
+        except Exception as e:
+            st.error(f"Could not load misspellings: {str(e)}")
+            return []
+
+    def taught_classes(self):
+        """(class_id, tenant, class name, word list, role) for the classes the user teaches"""
+        return [c for c in st.session_state.get('classes', []) if c[4] == 'teacher']
+
+    @timed_method
+    def get_class_stats(self, class_id, page=1, page_size=ADMIN_PAGE_SIZE):
+        try:
+            return cached_class_stats(class_id, page, page_size)
+        except Exception as e:
+            st.error(f"Could not get class statistics: {str(e)}")
+            return None
+
+    @timed_method
+    def get_user_stats(self, page=1, page_size=ADMIN_PAGE_SIZE):
+        try:
+            return cached_user_stats(page, page_size)
         except Exception as e:
             st.error(f"Could not get user statistics: {str(e)}")
             return None
 
+@st.cache_data(ttl=ADMIN_STATS_TTL, show_spinner=False)
+def cached_user_stats(page, page_size):
+    """Admin dashboard numbers from the maintained rollup tables, cached briefly"""
+    db = get_repository()
+    
+    # Only the requested page of users is read
+    user_stats = []
+    for user_id, is_guest, words, perfect, last_active in db.user_rollups(page_size, (page - 1) * page_size):
+        user_stats.append({
+            'Username': user_id,
+            'Type': 'Guest' if is_guest else 'Registered',
+            'Words': words,  # Changed from Words Practiced
+            'Perfect': perfect,  # Changed from Perfect Words
+            'Last Active': last_active
+        })
+    
+    return {
+        'user_stats': user_stats,
+        'total_registered': db.count_registered_users(),
+        'total_guests': db.count_users_with_progress(guests_only=True),
+        'total_with_progress': db.count_users_with_progress(),
+        # From the attempt log's per-word rollup, so it's one small table scan
+        'hardest_words': [
+            {'Word': word, 'Answers': attempts, 'Miss rate': f"{miss_rate:.0%}", 'Mean seconds': round(latency / 1000, 1)}
+            for word, attempts, miss_rate, latency in db.hardest_words(10)
+        ]
+    }
+
+@st.cache_data(ttl=ADMIN_STATS_TTL, show_spinner=False)
+def cached_class_stats(class_id, page, page_size):
+    """Teacher dashboard numbers for one class; every query is bounded by the class roster"""
+    db = get_repository()
+    
+    leaderboard = []
+    for user_id, words, perfect, last_active in db.class_rollups(class_id, page_size, (page - 1) * page_size):
+        leaderboard.append({
+            'Student': user_id,
+            'Words': words,
+            'Perfect': perfect,
+            'Last Active': last_active or ''
+        })
+    
+    return {
+        'leaderboard': leaderboard,
+        'students': db.count_class_members(class_id),
+        'hardest': [
+            {'Word': word, 'Students': students, 'Mean attempts': round(mean, 1)}
+            for word, students, mean in db.class_hardest_words(class_id)
+        ],
+        # Filled in bulk by `python -m spelling_app analyze-misses`
+        'patterns': [
+            {'Mistake': PATTERN_LABELS.get(pattern, pattern), 'Students': students, 'Misses': misses}
+            for pattern, students, misses in db.class_error_patterns(class_id)
+        ],
+        'trend': [
+            {'Day': day, 'Answers': attempts, 'Accuracy': f"{correct / attempts:.0%}",
+             'Mean seconds': round(latency / 1000, 1)}
+            for day, attempts, correct, latency in db.class_trend(class_id, trend_start())
+        ]
+    }
+
+def trend_start():
+    """First (UTC) day of the trend window, as stored in the daily rollup"""
+    return time.strftime('%Y-%m-%d', time.gmtime(time.time() - (TREND_DAYS - 1) * 86400))
+
+def switch_class():
+    # Runs before the rerun, so the new list is loaded when the page renders
+    st.session_state.word_list = st.session_state.class_list
+    st.session_state.practice_mode = False
+    st.session_state.current_words = array('I')
+    st.session_state.current_word = None
+    st.session_state.word_count = 0
+
+def current_view():
+    if 'username' not in st.session_state:
+        return 'login'
+    if st.session_state.get('show_statistics'):
+        return 'statistics'
+    if st.session_state.get('practice_mode'):
+        return 'practice'
+    return 'select'
+
 def main():
+    # Time every run, labelled by the view it started on
+    view = current_view()
+    started = time.perf_counter()
+    serve_metrics()
+    # Note this session's run; sessions idle too long lose their game state
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        get_idle_evictor(USER_STATE_KEYS).touch(ctx.session_id, ctx.session_state)
+    try:
+        render_page()
+    finally:
+        metrics.observe('spelling_render_seconds', time.perf_counter() - started, view=view)
+
+def render_page():
     st.set_page_config(page_title="Spelling Bee Practice", page_icon="🐝")
     
     # At the top of main(), add this meta tag configuration
@@ -438,12 +819,14 @@ def main():
     with st.sidebar:
         st.header("Progress")
         total_words = len(game.words)
-        completed = len([w for w in st.session_state.word_stats if st.session_state.word_stats[w] <= 2])
-        perfect = len([w for w in st.session_state.word_stats if st.session_state.word_stats[w] == 1])
+        summary = st.session_state.progress_summary
+        completed = summary.completed
+        perfect = summary.perfect
         
         st.write(f"📚 Total words: {total_words}")
         st.write(f"✅ Completed: {completed}")
         st.write(f"⭐ Perfect first try: {perfect}")
+        st.write(f"🔁 Due for review today: {game.count_due_today()}")
         
         # Add a divider
         st.write("---")
@@ -456,9 +839,12 @@ def main():
                 st.rerun()
         
         if st.button("Reset Progress"):
-            st.session_state.word_stats = {}
+            st.session_state.progress_summary = ProgressSummary()
+            st.session_state.word_stats = st.session_state.progress_summary.attempts
+            st.session_state.dirty_words = set()
+            st.session_state.due_queue = DueQueue()
             st.session_state.current_word = None
-            st.session_state.current_words = []
+            st.session_state.current_words = array('I')
             st.session_state.attempts = 0
             st.session_state.word_count = 0
             st.session_state.show_statistics = False
@@ -468,15 +854,65 @@ def main():
         # Add logout button to sidebar
         st.write(f"Logged in as: {st.session_state.username}")
         if st.button("Logout"):
-            del st.session_state.username
+            game.end_session()
             st.rerun()
         
+        # Students in several classes pick which class's list to practice
+        class_lists = {c[3]: f"{c[1]} / {c[2]}" for c in st.session_state.get('classes', []) if c[3]}
+        if len(class_lists) > 1:
+            current = st.session_state.get('word_list')
+            st.selectbox("Classroom", list(class_lists), format_func=class_lists.get, key="class_list",
+                         index=list(class_lists).index(current) if current in class_lists else 0,
+                         on_change=switch_class)
+        
+        # Teacher dashboard, one class at a time
+        taught = game.taught_classes()
+        if taught:
+            st.write("---")
+            st.subheader("🏫 Class Dashboard")
+            
+            labels = {c[0]: f"{c[1]} / {c[2]}" for c in taught}
+            class_id = st.selectbox("Class", list(labels), format_func=labels.get, key="teacher_class",
+                                    on_change=lambda: st.session_state.update(class_page=1))
+            def class_page(page):
+                stats = game.get_class_stats(class_id, page)
+                return stats, stats['students'] if stats else 0
+            stats, students = fetch_page(class_page, ADMIN_PAGE_SIZE, "class_page")
+            if stats:
+                st.write(f"Students: {stats['students']}")
+                show_table(
+                    stats['leaderboard'],
+                    'class',
+                    column_config={
+                        "Student": st.column_config.TextColumn("Student", width=150),
+                        "Words": st.column_config.NumberColumn("Words", width=80),
+                        "Perfect": st.column_config.NumberColumn("Perfect", width=80),
+                        "Last Active": st.column_config.TextColumn("Last Active", width=150)
+                    }
+                )
+                page_selector(students, ADMIN_PAGE_SIZE, "class_page")
+                
+                if stats['hardest']:
+                    st.write("Hardest words:")
+                    show_table(stats['hardest'], 'class_words')
+                
+                if stats['patterns']:
+                    st.write("Common mistakes:")
+                    show_table(stats['patterns'], 'class_patterns')
+                
+                if stats['trend']:
+                    st.write(f"Last {TREND_DAYS} days:")
+                    show_table(stats['trend'], 'class_trend')
+        
         # Add admin section
         if 'username' in st.session_state and game.is_admin(st.session_state.username):
             st.write("---")
             st.subheader("👑 Admin Dashboard")
             
-            stats = game.get_user_stats()
+            def admin_page(page):
+                stats = game.get_user_stats(page)
+                return stats, stats['total_with_progress'] if stats else 0
+            stats, total_with_progress = fetch_page(admin_page, ADMIN_PAGE_SIZE, "admin_page")
             if stats:
                 st.write(f"Total Users: {stats['total_registered'] + stats['total_guests']}")
                 st.write(f"- Registered: {stats['total_registered']}")
@@ -485,24 +921,46 @@ def main():
                 st.write("---")
                 st.write("User Details:")
                 
-                # Create DataFrame for user stats
-                df = pd.DataFrame(stats['user_stats'])
-                
-                # Sort by Perfect (descending)
-                df = df.sort_values('Perfect', ascending=False)
-                
-                # Display the DataFrame
-                st.dataframe(
-                    df,
+                # Rows arrive sorted by Perfect (descending)
+                show_table(
+                    stats['user_stats'],
+                    'admin',
                     column_config={
                         "Username": st.column_config.TextColumn("User", width=150),
                         "Type": st.column_config.TextColumn("Type", width=100),
                         "Words": st.column_config.NumberColumn("Words", width=80),
                         "Perfect": st.column_config.NumberColumn("Perfect", width=80),
                         "Last Active": st.column_config.TextColumn("Last Active", width=150)
-                    },
-                    hide_index=True
+                    }
                 )
+                
+                page_selector(total_with_progress, ADMIN_PAGE_SIZE, "admin_page")
+                
+                if stats['hardest_words']:
+                    st.write("Hardest words (all students):")
+                    show_table(stats['hardest_words'], 'admin_words')
+            
+            # Metrics panel
+            st.write("---")
+            st.subheader("📈 Metrics")
+            snapshot = metrics.snapshot()
+            gauges = snapshot['gauges']
+            st.write(f"Audio cache hit ratio: {gauges.get('spelling_audio_cache_hit_ratio', 0):.0%}")
+            st.write(f"DB queries: {int(gauges.get('spelling_db_queries_total', 0))}")
+            show_table(
+                [{
+                    "Timer": h['name'].replace('spelling_', '').replace('_seconds', ''),
+                    "What": ', '.join(h['labels'].values()),
+                    "Count": h['count'],
+                    "Mean ms": round(h['mean'] * 1000, 1),
+                    "p95 ms": round(h['p95'] * 1000, 1)
+                } for h in snapshot['histograms']],
+                'metrics'
+            )
+            st.download_button("Prometheus metrics", metrics.to_prometheus(),
+                               file_name="spelling_metrics.prom", mime="text/plain")
+            st.download_button("JSON snapshot", json.dumps(snapshot, indent=2),
+                               file_name="spelling_metrics.json", mime="application/json")
     
     # Main practice area
     if 'practice_mode' not in st.session_state:
@@ -510,6 +968,12 @@ def main():
     if 'show_statistics' not in st.session_state:
         st.session_state.show_statistics = False
     
+    # Answer feedback from the previous run
+    feedback = st.session_state.pop('feedback', None)
+    if feedback:
+        kind, message = feedback
+        getattr(st, kind)(message)
+    
     if st.session_state.show_statistics:
         st.header("📊 Word Statistics Report")
         if st.button("← Back to Practice", type="secondary"):
@@ -518,56 +982,77 @@ def main():
             
         # Show detailed results
         if st.session_state.word_stats:
-            # Create a list of dictionaries for the DataFrame
+            summary = st.session_state.progress_summary
+            
+            prefix, page_size = paging_controls("stats")
+            order = st.radio("Sort by", ["Most attempts", "Fewest attempts"], horizontal=True, key="stats_order",
+                             on_change=lambda: st.session_state.update(stats_page=1))
+            
+            # Only the visible page is built; the total sizes the pager
+            rows, total = fetch_page(
+                lambda page: game.stats_page(prefix, page, page_size, order == "Most attempts"), page_size, "stats_page")
+            
             word_stats_data = []
-            for num, word in game.words:
-                if word in st.session_state.word_stats:
-                    attempts = st.session_state.word_stats[word]
-                    if attempts == 1:
-                        status = "⭐"
-                        result = "Perfect!"
-                    elif attempts == 2:
-                        status = "✅"
-                        result = "Learned"
-                    else:
-                        status = "📝"
-                        result = "Needs Practice"
-                    
-                    word_stats_data.append({
-                        "Number": num,
-                        "Word": word,
-                        "Status": status,
-                        "Attempts": attempts,
-                        "Result": result
-                    })
-            
-            # Sort by attempts (descending)
-            word_stats_data.sort(key=lambda x: x["Attempts"], reverse=True)
-            
-            # Create and display DataFrame
-            df = pd.DataFrame(word_stats_data)
-            st.dataframe(
-                df,
+            for num, word, attempts in rows:
+                if attempts == 1:
+                    status = "⭐"
+                    result = "Perfect!"
+                elif attempts == 2:
+                    status = "✅"
+                    result = "Learned"
+                else:
+                    status = "📝"
+                    result = "Needs Practice"
+                
+                word_stats_data.append({
+                    "Number": num if num is not None else "",
+                    "Word": word,
+                    "Status": status,
+                    "Attempts": attempts,
+                    "Result": result
+                })
+            
+            # Display the table
+            show_table(
+                word_stats_data,
+                'statistics',
                 column_config={
                     "Number": st.column_config.TextColumn("Number", width=50),
                     "Word": st.column_config.TextColumn("Word", width=200),
                     "Status": st.column_config.TextColumn("Status", width=100),
                     "Attempts": st.column_config.NumberColumn("Attempts", width=100),
                     "Result": st.column_config.TextColumn("Result", width=150)
-                },
-                hide_index=True
+                }
             )
+            page_selector(total, page_size, "stats_page")
             
             # Add summary statistics
             st.write("---")
             st.write("Summary:")
-            perfect = len([d for d in word_stats_data if d["Attempts"] == 1])
-            learned = len([d for d in word_stats_data if d["Attempts"] == 2])
-            practice = len([d for d in word_stats_data if d["Attempts"] > 2])
+            perfect = summary.perfect
+            learned = summary.learned
+            practice = summary.needs_practice
             
             st.write(f"⭐ Perfect first try: {perfect}")
             st.write(f"✅ Learned after retry: {learned}")
             st.write(f"📝 Need more practice: {practice}")
+            
+            patterns = game.get_error_patterns()
+            if patterns:
+                st.write("---")
+                st.write("Your most common mistakes:")
+                show_table(patterns, 'patterns')
+            
+            # How every student has misspelled the missed words on this page
+            missed = [word for _, word, attempts in rows if attempts > 1]
+            if missed:
+                st.write("---")
+                word = st.selectbox("Common misspellings of", missed)
+                misspellings = game.get_common_misspellings(word)
+                if misspellings:
+                    show_table(misspellings, 'misspellings')
+                else:
+                    st.write("No misspellings analysed for this word yet.")
     
     elif not st.session_state.practice_mode:
         st.write("### Select Words to Practice")
@@ -598,14 +1083,23 @@ def main():
                     value=min(start_num + 9, total_words)
                 )
                 
-                selected_words = [word_tuple for word_tuple in game.words 
-                                if start_num <= word_tuple[0] <= end_num]
+                selected_words = game.words_in_range(start_num, end_num)
         
         elif range_option == "View Word List":
-            # Show the word list with numbers
+            # Show one page of the numbered word list
             st.write("### Word List")
-            for num, word in game.words:
-                st.write(f"{num}. {word}")
+            prefix, page_size = paging_controls("word_list")
+            entries, total = fetch_page(lambda page: game.word_list_page(prefix, page, page_size),
+                                        page_size, "word_list_page")
+            show_table(
+                [{"Number": num, "Word": word} for num, word in entries],
+                'word_list',
+                column_config={
+                    "Number": st.column_config.NumberColumn("Number", width=80),
+                    "Word": st.column_config.TextColumn("Word", width=250)
+                }
+            )
+            page_selector(total, page_size, "word_list_page")
             return
         
         else:  # All Words
@@ -615,14 +1109,12 @@ def main():
         with col1:
             if st.button("Start New Practice"):
                 available_words = [w for w in selected_words 
-                                 if w not in st.session_state.word_stats]
+                                 if w[1] not in st.session_state.word_stats]
                 if available_words:
-                    st.session_state.current_words = random.sample(
-                        available_words,
-                        len(available_words)
-                    )
+                    game.set_practice_words(random.sample(available_words, len(available_words)))
+                    # Start rendering audio before the first word is shown
+                    game.prefetch_words(game.practice_words(0, PREFETCH_AHEAD + 1))
                     st.session_state.practice_mode = True
-                    st.session_state.word_count = 0
                     st.rerun()
                 else:
                     st.warning("No new words to practice in selected range!")
@@ -630,42 +1122,74 @@ def main():
         with col2:
             if st.button("Practice Wrong Words"):
                 wrong_words = [w for w in selected_words 
-                             if w in st.session_state.word_stats 
-                             and st.session_state.word_stats[w] > 1]
+                             if w[1] in st.session_state.word_stats 
+                             and st.session_state.word_stats[w[1]] > 1]
                 if wrong_words:
-                    st.session_state.current_words = random.sample(
-                        wrong_words,
-                        len(wrong_words)
-                    )
+                    game.set_practice_words(random.sample(wrong_words, len(wrong_words)))
+                    # Start rendering audio before the first word is shown
+                    game.prefetch_words(game.practice_words(0, PREFETCH_AHEAD + 1))
                     st.session_state.practice_mode = True
-                    st.session_state.word_count = 0
                     st.rerun()
                 else:
                     st.warning("No words to practice in selected range!")
+        
+        if st.button("🔁 Review Due Words"):
+            # Spaced repetition: words come off the due queue earliest first
+            due_words = game.due_words(selected_words)
+            if due_words:
+                game.set_practice_words(due_words)
+                game.prefetch_words(game.practice_words(0, PREFETCH_AHEAD + 1))
+                st.session_state.practice_mode = True
+                st.rerun()
+            else:
+                st.warning("No words are due for review in selected range!")
+        
+        if st.button("🎯 Practice at My Level"):
+            # Drawn from the whole list by difficulty score, not the selected range
+            level_words = game.level_words()
+            if level_words:
+                game.set_practice_words(level_words)
+                game.prefetch_words(game.practice_words(0, PREFETCH_AHEAD + 1))
+                st.session_state.practice_mode = True
+                st.rerun()
+            else:
+                st.warning("No words left to practice at your level!")
+        
+        saved = game.load_session()
+        if saved and saved['count'] < len(saved['numbers']):
+            remaining = len(saved['numbers']) - saved['count']
+            if st.button(f"▶️ Resume Last Practice ({remaining} words left)"):
+                game.resume_practice(saved)
+                st.rerun()
     
     else:  # Practice mode
-        if not st.session_state.current_words:
+        if st.session_state.word_count >= len(st.session_state.current_words):
+            # Finished the list; carry the last answer's feedback over
+            if feedback:
+                st.session_state.feedback = feedback
             st.session_state.practice_mode = False
+            st.session_state.current_word = None
+            st.session_state.current_words = array('I')
+            game.clear_session()
             st.rerun()
             
         # Initialize new word and play audio
         if st.session_state.current_word is None:
-            # Get both number and word
-            current_word_tuple = st.session_state.current_words[st.session_state.word_count]
-            # Store just the word part for audio and comparison
-            st.session_state.current_word = current_word_tuple[1] if isinstance(current_word_tuple, tuple) else current_word_tuple
-            st.session_state.attempts = 0
-            # Generate audio
-            audio_data = game.speak_word(st.session_state.current_word)
-            st.session_state.current_audio = audio_data
+            # The round holds word numbers; keep the word itself for audio and comparison
+            st.session_state.current_word = game.word_at(st.session_state.current_words[st.session_state.word_count])
+            st.session_state.attempts = st.session_state.pop('resume_attempts', 0)
+            st.session_state.word_shown_at = time.time()
+            # Generate audio; the session keeps only its cache key
+            st.session_state.current_audio = game.speak_word(st.session_state.current_word)
+            # Keep the next few words rendering in the background
+            next_index = st.session_state.word_count + 1
+            game.prefetch_words(game.practice_words(next_index, next_index + PREFETCH_AHEAD))
             
         # Display progress
         total_practice_words = len(st.session_state.current_words)
         remaining_words = total_practice_words - st.session_state.word_count
         
-        # Get the word number if it's a tuple
-        current_word_tuple = st.session_state.current_words[st.session_state.word_count]
-        word_num = current_word_tuple[0] if isinstance(current_word_tuple, tuple) else "?"
+        word_num = st.session_state.current_words[st.session_state.word_count]
         
         st.write(f"Word #{word_num} ({st.session_state.word_count + 1} of {total_practice_words}, {remaining_words} remaining)")
         
@@ -678,14 +1202,12 @@ def main():
             st.markdown("### 🔊")
         with col2:
             if st.session_state.current_audio is not None:
-                # Create HTML with audio element
-                audio_html = f'''
-                    <audio controls>
-                        <source src="data:audio/mpeg;base64,{base64.b64encode(st.session_state.current_audio).decode()}" type="audio/mpeg">
-                        Your browser does not support the audio element.
-                    </audio>
-                    '''
-                st.components.v1.html(audio_html, height=50)
+                # Audio is fetched by URL (the audio server, or Streamlit's
+                # content-hashed media endpoint) so browsers can cache it
+                st.audio(
+                    game.audio_source(st.session_state.current_word, st.session_state.current_audio),
+                    format=game.tts.mime_type
+                )
         
         # Add a spacer
         st.write("")
@@ -714,41 +1236,50 @@ def main():
             submit_button = st.form_submit_button("Submit")
             
             if submit_button:
-                if user_input == st.session_state.current_word:
-                    success_container = st.empty()
-                    success_container.success("✨ Correct! Moving to next word in 2 seconds...")
-                    st.session_state.word_stats[st.session_state.current_word] = st.session_state.attempts + 1
-                    game.save_progress()
-                    time.sleep(2)
+                # Feedback is shown at the top of the next run, so the
+                # script never sleeps while holding a worker thread
+                correct = user_input == st.session_state.current_word
+                game.log_attempt(st.session_state.current_word, user_input, correct)
+                if correct:
+                    st.session_state.feedback = ('success', f"✨ Correct! \"{st.session_state.current_word}\" was right.")
+                    game.record_attempt(st.session_state.current_word, st.session_state.attempts + 1,
+                                        RETRY if st.session_state.attempts else FIRST_TRY)
                     st.session_state.word_count += 1
+                    st.session_state.attempts = 0
                     st.session_state.current_word = None
+                    # Saved on every answer, so any app process can resume it
+                    game.save_session()
                     st.rerun()
                 else:
                     st.session_state.attempts += 1
                     if st.session_state.attempts == 1:
-                        st.error("❌ Incorrect. Try once more!")
-                        st.write("Listen again:")
-                        time.sleep(1)
+                        st.session_state.feedback = ('error', "❌ Incorrect. Try once more! Listen again:")
+                        game.save_session()
                         st.rerun()
                     else:
-                        error_container = st.empty()
-                        error_container.error(f"❌ Incorrect. The correct spelling is: {st.session_state.current_word}")
-                        st.session_state.word_stats[st.session_state.current_word] = st.session_state.attempts
-                        game.save_progress()
-                        time.sleep(3)
+                        st.session_state.feedback = ('error', f"❌ Incorrect. The correct spelling of the last word was: {st.session_state.current_word}")
+                        game.record_attempt(st.session_state.current_word, st.session_state.attempts, FAILED)
                         st.session_state.word_count += 1
+                        st.session_state.attempts = 0
                         st.session_state.current_word = None
+                        game.save_session()
                         st.rerun()
         
         if st.button("Quit Practice"):
             game.save_session()  # Save session before quitting
             st.session_state.practice_mode = False
             st.session_state.current_word = None
-            st.session_state.current_words = []
+            st.session_state.current_words = array('I')
             st.rerun()
 
     # Keep only the bottom credit
     st.markdown("<br><hr><div style='text-align: center; color: gray; font-size: 0.8em; padding: 20px;'>Developed by LBC Productions</div>", unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # `streamlit run spelling_app.py` starts the app; `python -m spelling_app <command>` runs a tool
+    if len(sys.argv) > 1:
+        # argparse and multiprocessing are only loaded when a tool is run
+        import cli
+        if sys.argv[1] in cli.COMMANDS:
+            sys.exit(cli.main(sys.argv[1:]))
+    main()
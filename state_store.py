@@ -0,0 +1,132 @@
+"""Key-value store shared by every app process
+
+Several Streamlit processes can run behind a load balancer without sticky
+sessions: anything a reconnecting browser needs (its login) lives here
+rather than in st.session_state, and progress and practice sessions live
+in the SQLite database. Such deployments must also run the audio server
+(SPELLING_AUDIO_PORT and SPELLING_AUDIO_URL, see audio_cache), as
+Streamlit's own media files exist only in the process that rendered them.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from db import SCRIPT_DIR, ConnectionPool
+
+STATE_DB = os.environ.get("SPELLING_STATE_DB", os.path.join(SCRIPT_DIR, "spelling_state.db"))
+
+
+class StateStore(ABC):
+    """Bytes or text values by key, each with an optional time to live in seconds"""
+    name = "base"
+
+    @abstractmethod
+    def get(self, key):
+        """The value stored under key, or None if it is missing or expired"""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store value under key, replacing any earlier value"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove key; a missing key is not an error"""
+
+    def close(self):
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """Single-process store, for one app process or tests"""
+    name = "memory"
+
+    def __init__(self):
+        self._values = {}  # key -> (expires or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._values[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (time.time() + ttl if ttl else None, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class SQLiteStateStore(StateStore):
+    """Store in a WAL-mode SQLite file that every process on the host opens"""
+    name = "sqlite"
+
+    def __init__(self, path=STATE_DB):
+        self.pool = ConnectionPool(path)
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS kv
+                (key TEXT PRIMARY KEY,
+                 value BLOB,
+                 expires REAL)
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires)')
+
+    def get(self, key):
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires >= ?)',
+                               (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO kv (key, value, expires) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires
+            ''', (key, value, now + ttl if ttl else None))
+            # Expired keys are dropped as new ones are written
+            conn.execute('DELETE FROM kv WHERE expires < ?', (now,))
+
+    def delete(self, key):
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def close(self):
+        self.pool.close()
+
+
+STORES = {
+    MemoryStateStore.name: MemoryStateStore,
+    SQLiteStateStore.name: SQLiteStateStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def set_state_store(store):
+    """Replace the process-wide store, e.g. with a MemoryStateStore in tests"""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def get_state_store():
+    """Process-wide store named by $SPELLING_STATE_STORE (default sqlite)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = os.environ.get("SPELLING_STATE_STORE", SQLiteStateStore.name)
+                if name not in STORES:
+                    raise ValueError(f"Unknown state store {name!r}; choose from {', '.join(STORES)}")
+                _store = STORES[name]()
+    return _store
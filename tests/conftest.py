@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import word_lists  # noqa: E402
+from audio_cache import AudioCache, set_audio_cache  # noqa: E402
+from db import SpellingRepository, close_attempt_log, close_progress_writer, set_repository  # noqa: E402
+from state_store import MemoryStateStore, set_state_store  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "spelling_app.py")
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SpellingRepository(str(tmp_path / "progress.db"), str(tmp_path / "users.db"))
+    set_repository(repository)
+    yield repository
+    close_attempt_log()
+    close_progress_writer()
+    set_repository(None)
+    repository.close()
+
+
+@pytest.fixture
+def app(repository, tmp_path, monkeypatch):
+    """The real app on a temporary database, with stub TTS and in-memory login store"""
+    testing = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.setenv("SPELLING_TTS_BACKEND", "stub")
+    # Word lists are cached per process against the repository they were imported into
+    monkeypatch.setattr(word_lists, '_store', None)
+    set_audio_cache(AudioCache(str(tmp_path / "audio")))
+    set_state_store(MemoryStateStore())
+    return testing.AppTest.from_file(APP_PATH, default_timeout=30)
+
+
+def click(app, label):
+    next(button for button in app.button if button.label == label).click().run()
+    assert not app.exception, app.exception[0].message
+
+
+def answer(app, typed):
+    state = app.session_state
+    app.text_input(key=f"word_input_{state['word_count']}_{state['attempts']}").input(typed)
+    click(app, "Submit")
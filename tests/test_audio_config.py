@@ -0,0 +1,18 @@
+import importlib
+import logging
+
+import audio_cache
+
+
+def test_audio_port_without_url_is_reported_once_and_disabled(monkeypatch, caplog):
+    monkeypatch.setenv("SPELLING_AUDIO_PORT", "8502")
+    monkeypatch.delenv("SPELLING_AUDIO_URL", raising=False)
+    try:
+        with caplog.at_level(logging.ERROR, logger="audio_cache"):
+            importlib.reload(audio_cache)
+        assert "SPELLING_AUDIO_URL" in caplog.text
+        # Audio falls back to the page itself instead of failing on every word
+        assert audio_cache.get_audio_url("0" * 64, ".wav") is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(audio_cache)
@@ -0,0 +1,41 @@
+from conftest import answer, click
+from idle_sessions import IdleSessionEvictor
+from spelling_app import USER_STATE_KEYS
+
+
+def idle_evict(app):
+    """Sweep the app's real (Safe)SessionState as the running app would, after it went idle"""
+    evictor = IdleSessionEvictor(USER_STATE_KEYS, timeout=60)
+    evictor.touch("session", app._session_state, now=0)
+    return evictor.sweep(now=61)
+
+
+def test_idle_practice_is_evicted_and_resumed(app):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    click(app, "Start New Practice")
+    # The round is saved for resuming once a word has been answered
+    answer(app, app.session_state['current_word'])
+    word_count = app.session_state['word_count']
+    words = list(app.session_state['current_words'])
+
+    assert idle_evict(app) == 1
+    assert 'current_words' not in app.session_state
+    assert 'practice_mode' not in app.session_state
+    assert app.session_state['resume_pending']
+
+    app.run()
+    assert not app.exception
+    assert app.session_state['practice_mode']
+    assert app.session_state['word_count'] == word_count
+    assert list(app.session_state['current_words']) == words
+
+
+def test_session_with_unsaved_answers_is_kept(app):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    click(app, "Start New Practice")
+    app.session_state['dirty_words'] = {"example"}
+
+    assert idle_evict(app) == 0
+    assert app.session_state['practice_mode']
@@ -0,0 +1,42 @@
+import itertools
+import random
+
+import pytest
+
+import word_lists
+from conftest import click
+from progress_summary import ProgressSummary
+
+
+@pytest.fixture
+def big_list(repository, tmp_path):
+    """A 2000-word list, imported as 'big'"""
+    words = [''.join(letters) for letters in itertools.product('bcdfghklmnpr', 'aeiou', 'stlnr', 'aeiouy')][:2000]
+    path = tmp_path / "big.txt"
+    path.write_text('\n'.join(words))
+    word_lists.import_word_list('big', str(path), repository)
+    return words
+
+
+def practice_at_level(app, words, unmastered):
+    """Start a level round on the big list with every word mastered except unmastered"""
+    app.run()
+    click(app, "👤 Continue as Guest")
+    app.session_state['word_list'] = 'big'
+    app.session_state['progress_summary'] = ProgressSummary.from_stats(
+        {word: 1 for word in words if word not in unmastered})
+    click(app, "🎯 Practice at My Level")
+    word_list = word_lists.get_word_list_store().get('big')
+    return {word_list.word_at(number) for number in app.session_state['current_words']}
+
+
+def test_mostly_mastered_list_still_fills_the_round(app, big_list):
+    unmastered = set(random.Random(1).sample(big_list, 200))
+    round_words = practice_at_level(app, big_list, unmastered)
+    assert len(round_words) == 20
+    assert round_words <= unmastered
+
+
+def test_round_takes_every_remaining_word(app, big_list):
+    unmastered = set(random.Random(2).sample(big_list, 5))
+    assert practice_at_level(app, big_list, unmastered) == unmastered
@@ -0,0 +1,21 @@
+from conftest import APP_PATH, click
+from state_store import get_state_store
+
+
+def test_restoring_a_login_replaces_its_token(app):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    token = app.query_params['session']
+    username = app.session_state['username']
+
+    # A second browser session, e.g. after reconnecting to another app process
+    restored = type(app).from_file(APP_PATH, default_timeout=30)
+    restored.query_params['session'] = token
+    restored.run()
+
+    assert not restored.exception
+    assert restored.session_state['username'] == username
+    new_token = restored.query_params['session']
+    assert new_token != token
+    assert get_state_store().get(f"login:{token}") is None
+    assert get_state_store().get(f"login:{new_token}") == username
@@ -0,0 +1,18 @@
+import json
+
+from metrics import Histogram, Metrics
+
+
+def test_overflow_quantile_is_the_largest_finite_bound():
+    histogram = Histogram()
+    histogram.observe(0.002)
+    histogram.observe(30.0)
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.99) == 10.0
+
+
+def test_snapshot_is_strict_json():
+    metrics = Metrics()
+    metrics.observe('spelling_render_seconds', 60.0, view='practice')
+    snapshot = json.loads(json.dumps(metrics.snapshot(), allow_nan=False))
+    assert snapshot['histograms'][0]['p99'] == 10.0
@@ -0,0 +1,33 @@
+from conftest import answer, click
+from db import get_attempt_log
+from misspellings import analyze, refresh_error_patterns
+
+
+def test_shifted_double_letters_are_doubling_errors():
+    assert analyze("tomorrow", "tommorow") == (2, ['extra_double', 'missed_double'])
+    assert analyze("occasion", "ocassion") == (2, ['missed_double', 'extra_double'])
+    assert analyze("letter", "leter") == (1, ['missed_double'])
+
+
+def test_other_errors_keep_their_labels():
+    assert analyze("receive", "recieve")[1] == ['ie_ei']
+    assert analyze("cat", "cut")[1] == ['vowel']
+    assert analyze("cat", "cart")[1] == ['insertion']
+    assert analyze("make", "mak")[1] == ['silent_e']
+
+
+def test_statistics_show_common_misspellings(app, repository):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    click(app, "Start New Practice")
+    word = app.session_state['current_word']
+    typed = word + "q"
+    answer(app, typed)
+    answer(app, typed)
+
+    get_attempt_log().flush()
+    refresh_error_patterns(repository)
+
+    click(app, "📊 View Word Statistics")
+    tables = [table.value for table in app.dataframe]
+    assert any(list(table.get('Typed', [])) == [typed] for table in tables)
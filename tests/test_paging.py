@@ -0,0 +1,31 @@
+from conftest import click
+from progress_summary import ProgressSummary
+
+
+def test_page_past_the_end_renders_the_last_page(app):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    # e.g. left on a late page before the search narrowed the list
+    app.session_state["word_list_page"] = 99
+    app.radio(key="range_option").set_value("View Word List").run()
+
+    assert not app.exception
+    pages = app.number_input(key="word_list_page")
+    assert pages.value == pages.max
+    assert len(app.dataframe[0].value) > 0
+
+
+def test_summary_pages_stay_sorted_as_words_are_recorded():
+    numbers = {word: i for i, word in enumerate("abcdefgh", 1)}
+    key = numbers.get
+    summary = ProgressSummary.from_stats({'f': 1, 'b': 1, 'h': 2, 'd': 1})
+    assert summary.page(0, 10, key=key) == [(2, 'h'), (1, 'b'), (1, 'd'), (1, 'f')]
+    sorted_bucket = summary._sorted[1]
+
+    summary.record('c', 1)
+    summary.record('d', 2)
+    summary.record('a', 2)
+    assert summary.page(0, 10, key=key) == [(2, 'a'), (2, 'd'), (2, 'h'), (1, 'b'), (1, 'c'), (1, 'f')]
+    assert summary.page(2, 2, key=key) == [(2, 'h'), (1, 'b')]
+    # Updated in place rather than sorted again
+    assert summary._sorted[1] is sorted_bucket
@@ -0,0 +1,76 @@
+import time
+
+import db
+import word_lists
+from conftest import answer, click
+from scheduler import DEFAULT_EASE, FAILED, FIRST_TRY, RETRY, DueQueue, ReviewState, quality_for, review
+
+
+def test_failed_word_is_relearned():
+    learned = review(review(None, quality_for(FIRST_TRY), 0), quality_for(FIRST_TRY), 0)
+    assert learned.repetitions == 2
+
+    failed = review(learned, quality_for(FAILED), 0)
+    assert failed.repetitions == 0
+    assert failed.interval == 1
+    assert failed.ease < learned.ease
+
+
+def test_retry_still_counts_as_a_pass():
+    state = review(None, quality_for(RETRY), 0)
+    assert state.repetitions == 1
+
+
+def test_word_missed_twice_is_scheduled_as_a_failure(app):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    click(app, "Start New Practice")
+
+    word = app.session_state['current_word']
+    answer(app, word[::-1] + "x")
+    answer(app, word[::-1] + "x")
+
+    state = app.session_state['due_queue'].states[word]
+    assert state.repetitions == 0
+    assert state.interval == 1
+    assert app.session_state['word_stats'][word] == 2
+
+
+def test_pop_due_returns_each_word_once():
+    queue = DueQueue()
+    queue.update('cat', review(None, quality_for(FIRST_TRY), 0))
+    queue.update('cat', review(None, quality_for(FAILED), 0))
+    assert queue.pop_due(10 ** 10) == ['cat']
+
+
+def test_due_words_left_unanswered_stay_due(app):
+    app.run()
+    click(app, "👤 Continue as Guest")
+    words = word_lists.get_word_list_store().get().words[:3]
+    app.session_state['due_queue'] = DueQueue({word: ReviewState(DEFAULT_EASE, 1, 1, 0) for word in words})
+    click(app, "🔁 Review Due Words")
+    answered = app.session_state['current_word']
+    answer(app, answered)
+
+    # Leave the round without Quit
+    click(app, "📊 View Word Statistics")
+    left = app.session_state['due_queue'].pop_due(time.time())
+    assert sorted(left) == sorted(word for word in words if word != answered)
+
+
+def test_write_behind_queues_schedule_rows_with_progress(app, repository, monkeypatch):
+    monkeypatch.setattr(db, 'WRITE_BEHIND', True)
+    # Flushed only by the test; the fixture closes it
+    monkeypatch.setattr(db, '_writer', db.ProgressWriter(repository, interval=3600))
+    app.run()
+    click(app, "👤 Continue as Guest")
+    click(app, "Start New Practice")
+    word = app.session_state['current_word']
+    answer(app, word)
+    user = app.session_state['username']
+
+    # Nothing is committed for the answer until the writer flushes
+    assert repository.load_schedule(user) == {}
+    db.get_progress_writer().flush()
+    assert list(repository.load_schedule(user)) == [word]
+    assert repository.load_progress(user) == {word: 1}
@@ -0,0 +1,19 @@
+import pytest
+
+from state_store import MemoryStateStore, StateStore
+
+
+def test_store_must_implement_get_set_delete():
+    with pytest.raises(TypeError):
+        StateStore()
+
+
+def test_expired_values_are_gone():
+    store = MemoryStateStore()
+    store.set("login:a", "ann", ttl=-1)
+    store.set("login:b", "bob")
+    assert store.get("login:a") is None
+    assert store.get("login:b") == "bob"
+    store.delete("login:b")
+    store.delete("login:b")
+    assert store.get("login:b") is None
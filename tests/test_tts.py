@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import click
+from tts import TTSBackend
+
+
+def test_backend_must_implement_synthesize():
+    with pytest.raises(TypeError):
+        TTSBackend()
+
+
+def test_unknown_backend_leaves_practice_without_audio(app, monkeypatch):
+    monkeypatch.setenv("SPELLING_TTS_BACKEND", "espeek")
+    app.run()
+    assert not app.exception
+    assert any("Text-to-speech unavailable" in error.value for error in app.error)
+
+    click(app, "👤 Continue as Guest")
+    click(app, "Start New Practice")
+    assert app.session_state['practice_mode']
+    assert app.session_state['current_audio'] is None
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BATCH_WORKERS = 4
+
+
+class TTSBackend(ABC):
+    """Base class for text-to-speech engines used by the audio cache"""
+    name = "base"
+    version = "1"
+    extension = ".mp3"
+    mime_type = "audio/mpeg"
+
+    @property
+    def engine(self):
+        # Part of the audio cache key, so bump version when output changes
+        return f"{self.name}-{self.version}"
+
+    @abstractmethod
+    def synthesize(self, word, lang='en', slow=False):
+        """Audio bytes for one word, in this backend's format"""
+
+    def synthesize_many(self, words, lang='en', slow=False, workers=DEFAULT_BATCH_WORKERS):
+        """Render a whole word list, returning {word: audio bytes}"""
+        unique_words = list(dict.fromkeys(words))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda w: self.synthesize(w, lang, slow), unique_words)
+            return dict(zip(unique_words, results))
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS; needs network access"""
+    name = "gtts"
+    version = "1"
+
+    def synthesize(self, word, lang='en', slow=False):
+        from gtts import gTTS
+
+        tts = gTTS(text=word, lang=lang, slow=slow)
+        buffer = io.BytesIO()
+        tts.write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class EspeakBackend(TTSBackend):
+    """Local espeak-ng/espeak subprocess; works fully offline"""
+    name = "espeak"
+    version = "1"
+    extension = ".wav"
+    mime_type = "audio/wav"
+
+    def __init__(self, binary=None):
+        self.binary = binary or shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.binary:
+            raise RuntimeError("espeak-ng or espeak must be installed for the offline TTS backend")
+
+    def synthesize(self, word, lang='en', slow=False):
+        result = subprocess.run(
+            [self.binary, "-v", lang, "-s", "110" if slow else "150", "--stdin", "--stdout"],
+            input=word.encode('utf-8'),
+            capture_output=True,
+            check=True,
+        )
+        return result.stdout
+
+    def synthesize_many(self, words, lang='en', slow=False, workers=None):
+        # espeak is CPU bound, so use one process per core
+        return super().synthesize_many(words, lang, slow, workers or os.cpu_count() or 1)
+
+
+class StubBackend(TTSBackend):
+    """Deterministic silent WAV per word, for tests and benchmarks"""
+    name = "stub"
+    version = "1"
+    extension = ".wav"
+    mime_type = "audio/wav"
+
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, word, lang='en', slow=False):
+        self.calls += 1
+        digest = hashlib.sha256(f"{lang}\0{int(bool(slow))}\0{word}".encode('utf-8')).digest()
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(1)
+            wav.setframerate(8000)
+            wav.writeframes(digest * (25 * max(len(word), 1)))
+        return buffer.getvalue()
+
+    def synthesize_many(self, words, lang='en', slow=False, workers=None):
+        return {word: self.synthesize(word, lang, slow) for word in dict.fromkeys(words)}
+
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    EspeakBackend.name: EspeakBackend,
+    StubBackend.name: StubBackend,
+}
+
+_backends = {}
+
+
+def get_backend(name=None):
+    """Return the shared backend named by name or $SPELLING_TTS_BACKEND (default gtts)"""
+    name = name or os.environ.get("SPELLING_TTS_BACKEND", GTTSBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend: {name}")
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
@@ -0,0 +1,208 @@
+import csv
+import hashlib
+import os
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from db import get_repository
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LIST = "default"
+DEFAULT_LIST_PATH = os.path.join(SCRIPT_DIR, "spelling_words.csv")
+IMPORT_CHUNK_SIZE = 5000
+HEADER_WORDS = ('word', 'words')
+
+
+class WordList:
+    """Immutable word list: words in list order plus a word -> number index"""
+    __slots__ = ('name', 'list_id', 'digest', 'words', 'index', '_entries', '_sorted')
+
+    def __init__(self, name, list_id, digest, words):
+        self.name = name
+        self.list_id = list_id
+        self.digest = digest
+        # Interned, so progress loaded from the database shares these strings
+        self.words = tuple(map(sys.intern, words))
+        # Imports are deduplicated, so every word has exactly one number
+        self.index = {word: i for i, word in enumerate(self.words, 1)}
+        self._entries = None
+        self._sorted = None
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def entries(self):
+        """(number, word) tuples as used by the practice screens, built once per list"""
+        if self._entries is None:
+            self._entries = tuple(enumerate(self.words, 1))
+        return self._entries
+
+    def number_of(self, word):
+        return self.index.get(word)
+
+    def number_key(self, word):
+        """Sort key putting words in list order, and words not in the list first"""
+        return self.index.get(word, 0)
+
+    def word_at(self, number):
+        return self.words[number - 1]
+
+    def _sorted_index(self):
+        # (words alphabetically, their numbers), built on the first search
+        if self._sorted is None:
+            numbers = sorted(range(1, len(self.words) + 1), key=lambda n: self.words[n - 1])
+            self._sorted = (tuple(self.words[n - 1] for n in numbers), tuple(numbers))
+        return self._sorted
+
+    def prefix_range(self, prefix):
+        """Half-open range of alphabetical positions holding the words that start with prefix"""
+        words, _ = self._sorted_index()
+        prefix = normalize_word(prefix)
+        return bisect_left(words, prefix), bisect_left(words, prefix + '\U0010ffff')
+
+    def search(self, prefix='', offset=0, limit=None):
+        """(entries, total): one page of (number, word) matching prefix; only the page is built"""
+        if not prefix:
+            stop = len(self.words) if limit is None else offset + limit
+            return list(self.entries[offset:stop]), len(self.words)
+        start, end = self.prefix_range(prefix)
+        words, numbers = self._sorted_index()
+        stop = end if limit is None else min(end, start + offset + limit)
+        return list(zip(numbers[start + offset:stop], words[start + offset:stop])), end - start
+
+
+def normalize_word(word):
+    return unicodedata.normalize('NFC', word).strip().lower()
+
+
+def _optional_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_word_rows(file, fmt):
+    """Yield (word, difficulty, grade) rows from a CSV, TSV or one-word-per-line text file"""
+    if fmt == 'txt':
+        for line in file:
+            yield line, None, None
+        return
+    for row in csv.reader(file, delimiter='\t' if fmt == 'tsv' else ','):
+        if not row:
+            continue
+        difficulty = _optional_int(row[1]) if len(row) > 1 else None
+        grade = _optional_int(row[2]) if len(row) > 2 else None
+        yield row[0], difficulty, grade
+
+
+def iter_word_chunks(path, chunk_size=IMPORT_CHUNK_SIZE, grade=None):
+    """Stream normalized, deduplicated rows from a word file in chunks
+
+    Rows are (word, difficulty, grade); a row without a grade gets the given
+    default. The file is never held in memory as a whole.
+    """
+    fmt = os.path.splitext(path)[1].lower().lstrip('.')
+    if fmt not in ('csv', 'tsv', 'txt'):
+        fmt = 'txt'
+    seen = set()
+    chunk = []
+    with open(path, 'r', newline='', encoding='utf-8-sig') as file:
+        for i, (word, difficulty, row_grade) in enumerate(read_word_rows(file, fmt)):
+            word = normalize_word(word)
+            if not word or word in seen or (i == 0 and word in HEADER_WORDS):
+                continue
+            seen.add(word)
+            chunk.append((word, difficulty, row_grade if row_grade is not None else grade))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tenant_list_name(tenant, name):
+    """Lists owned by a tenant are namespaced so schools can reuse list names"""
+    return f"{tenant}/{name}"
+
+
+def import_word_list(name, path, repository=None, chunk_size=IMPORT_CHUNK_SIZE, grade=None, digest=None,
+                     tenant_id=None):
+    """Import a word file into the database as the named list; returns (list_id, word count)"""
+    repository = repository or get_repository()
+    digest = digest or file_digest(path)
+    return repository.replace_word_list(
+        name, os.path.abspath(path), digest, iter_word_chunks(path, chunk_size, grade), tenant_id)
+
+
+class WordListStore:
+    """Process-wide cache of named word lists
+
+    Lists live in the database. The default list is also backed by its CSV
+    file and re-imported when the file's content changes; a rerun with an
+    unchanged file only costs a stat().
+    """
+
+    def __init__(self, repository=None):
+        self._repository = repository
+        self._paths = {DEFAULT_LIST: DEFAULT_LIST_PATH}
+        self._stats = {}  # name -> (mtime_ns, size) of the last synced file
+        self._lists = {}  # name -> WordList
+        self._lock = threading.Lock()
+
+    @property
+    def repository(self):
+        if self._repository is None:
+            self._repository = get_repository()
+        return self._repository
+
+    def get(self, name=DEFAULT_LIST):
+        with self._lock:
+            path = self._paths.get(name)
+            if path:
+                stat = os.stat(path)
+                file_stat = (stat.st_mtime_ns, stat.st_size)
+                if name in self._lists and self._stats.get(name) == file_stat:
+                    return self._lists[name]
+                self._sync_file(name, path)
+                self._stats[name] = file_stat
+
+            row = self.repository.get_word_list(name)
+            if row is None:
+                raise KeyError(f"Unknown word list: {name}")
+            list_id, digest, _ = row
+            cached = self._lists.get(name)
+            if cached is None or cached.list_id != list_id or cached.digest != digest:
+                cached = WordList(name, list_id, digest, self.repository.load_list_words(list_id))
+                self._lists[name] = cached
+            return cached
+
+    def _sync_file(self, name, path):
+        digest = file_digest(path)
+        row = self.repository.get_word_list(name)
+        if row is None or row[1] != digest:
+            import_word_list(name, path, self.repository, digest=digest)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_word_list_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = WordListStore()
+    return _store